@@ -2,6 +2,7 @@
 import sys
 import os
 import subprocess
+import pkgutil
 import importlib.util
 import platform
 
@@ -9,16 +10,24 @@ def install_dependencies():
     print("Checking dependencies...")
     required = [
         "torch", "transformers", "pillow", "numpy", 
-        "sounddevice", "soundfile", "pyperclip", "PyMuPDF", "python-docx", "tiktoken"
+        "sounddevice", "soundfile", "pyperclip", "PyMuPDF", "tiktoken", "hf_transfer"
     ]
     
+    import_names = {"PyMuPDF": "fitz", "pillow": "PIL"}
+    # One sweep of sys.path instead of a find_spec lookup per package
+    installed = {m.name for m in pkgutil.iter_modules()}
+    
     for module in required:
-        module_name = "fitz" if module == "PyMuPDF" else "docx" if module == "python-docx" else module
-        if not importlib.util.find_spec(module_name):
+        module_name = import_names.get(module, module)
+        if module_name not in installed:
             print(f"Installing {module}...")
             subprocess.run([sys.executable, "-m", "pip", "install", module], check=True)
     
-    if "COLAB_" in "".join(os.environ.keys()):
+    # Unsloth (and the Colab-specific stack around it) only needs installing once
+    if "unsloth" in installed:
+        return
+        
+    if any(key.startswith("COLAB_") for key in os.environ):
         colab_cmds = [
             "pip install --no-deps bitsandbytes accelerate xformers==0.0.29.post3 peft trl triton cut_cross_entropy unsloth_zoo",
             "pip install sentencepiece protobuf 'datasets>=3.4.1,<4.0.0' 'huggingface_hub>=0.34.0' hf_transfer",
@@ -27,47 +36,172 @@ def install_dependencies():
         for cmd in colab_cmds:
             subprocess.run(cmd, shell=True, check=True)
     else:
-        if not importlib.util.find_spec("unsloth"):
-            subprocess.run([sys.executable, "-m", "pip", "install", "unsloth"], check=True)
+        subprocess.run([sys.executable, "-m", "pip", "install", "unsloth"], check=True)
 
 try:
     install_dependencies()
 except:
     print("Auto-install failed. Please install dependencies manually.")
 
+# Multi-connection Rust downloader for model shards, when it's installed
+if importlib.util.find_spec("hf_transfer"):
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
+import tkinter.font as tkfont
 import gc
-import torch
 import tempfile
+import shutil
 import threading
+import concurrent.futures
 import queue
+import collections
+import functools
+import types
+import fnmatch
 from PIL import Image, ImageGrab, ImageTk
-import numpy as np
-from unsloth import FastModel
-from transformers import TextStreamer
 import sounddevice as sd
 import soundfile as sf
 import pyperclip
 import time
-import fitz
-import io
-import docx
-from html.parser import HTMLParser
+import zipfile
+import xml.etree.ElementTree as ET
 import re
-import tiktoken
 import json
-import urllib.request
-import urllib.error
+import hashlib
+import socket
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Reads MP3/M4A/AAC/WMA durations from tags and frame headers, when it's installed
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+# torch, unsloth, transformers, fitz and tiktoken are imported where they are
+# first needed so document-only sessions don't pay for them at startup
+# Background workers for slow filesystem operations (model deletion, cache cleanup, exports)
+IO_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+# Single worker for counting large pasted contexts off the UI thread
+TOKEN_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+def import_torch():
+    import torch
+    torch._dynamo.config.cache_size_limit = 64
+    return torch
+
+def import_fast_model():
+    import_torch()
+    from unsloth import FastModel
+    return FastModel
+
+DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DOCX_PARAGRAPH_TAG = DOCX_NS + "p"
+DOCX_TEXT_TAG = DOCX_NS + "t"
+DOCX_TAB_TAG = DOCX_NS + "tab"
+DOCX_PARAGRAPH_PROPERTIES_TAG = DOCX_NS + "pPr"
+DOCX_BREAK_TAGS = (DOCX_NS + "br", DOCX_NS + "cr")
+
+BNB4_ALIASES = {
+    "unsloth/gemma-3n-E4B-it": "unsloth/gemma-3n-E4B-it-unsloth-bnb-4bit",
+    "unsloth/gemma-3n-E2B-it": "unsloth/gemma-3n-E2B-it-unsloth-bnb-4bit",
+    "google/gemma-3n-E4B-it": "unsloth/gemma-3n-E4B-it-unsloth-bnb-4bit",
+    "google/gemma-3n-E2B-it": "unsloth/gemma-3n-E2B-it-unsloth-bnb-4bit",
+}
+
+# Containers libsndfile parses natively; other audio formats try mutagen first
+SOUNDFILE_AUDIO_EXTENSIONS = frozenset({'.wav', '.flac', '.ogg'})
+
+# Extracted PDF page and DOCX text, keyed by file path, size and mtime
+DOCUMENT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".educational_ai_tutor", "cache", "documents")
+
+TEXT_DOCUMENT_EXTENSIONS = frozenset({'.txt', '.md', '.py', '.js', '.html', '.css', '.xml', '.json'})
+
+RTF_STRIP_RE = re.compile(rb'\\[a-z]+\d*\s?|\{|\}')
+
+MODEL_CATALOG_TTL = 24 * 60 * 60
+
+PROMPT_CACHE_SIZE = 64
+
+HISTORY_VIEW_LIMIT = 200
+
+# Microphone recordings are written as mono 16-bit WAV at this rate
+RECORDING_SAMPLE_RATE = 44100
+
+# Gemma chat template markers used when building the prompt
+USER_TURN_PREFIX = "<start_of_turn>user\n"
+MODEL_TURN_PREFIX = "<start_of_turn>model\n"
+TURN_SUFFIX = "<end_of_turn>\n"
+
+# Release cached CUDA blocks every N generations, or sooner when free VRAM runs low
+CUDA_CLEANUP_INTERVAL = 10
+CUDA_CLEANUP_FREE_RATIO = 0.15
+
+# Token accounting rules, shared by TokenManager and the help pages
+TOKEN_RATES = types.MappingProxyType({
+    "context_limit": 32000,
+    "image": 256,
+    "audio_per_sec": 6.25,
+    "audio_per_min": 6.25 * 60,
+})
+
+DOWNLOAD_IGNORE_PATTERNS = ("*.gguf", "*.onnx", "*.onnx_data", "*.msgpack", "*.h5", "*.ot", "*.tflite")
+
+# Help pages live in help_content/<name>.txt and are only read when their tab opens;
+# {field} placeholders in them are filled from TOKEN_RATES
+HELP_CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "help_content")
+HELP_TABS = (
+    ("🏠 Overview", "overview"),
+    ("🌐 Offline Mode", "offline_mode"),
+    ("🚀 Getting Started", "getting_started"),
+    ("🎓 Educational Tools", "educational_tools"),
+    ("🖼️ Multimodal Features", "multimodal"),
+    ("🔢 Token Management", "token_management"),
+    ("💡 Tips & Best Practices", "tips"),
+    ("🔧 Troubleshooting", "troubleshooting"),
+)
+
+@functools.lru_cache(maxsize=None)
+def load_help_text(name):
+    try:
+        with open(os.path.join(HELP_CONTENT_DIR, name + ".txt"), encoding="utf-8") as f:
+            return f.read().format_map(TOKEN_RATES)
+    except OSError as e:
+        return f"Help page '{name}' could not be loaded: {e}"
+
+def get_clipboard_change_count():
+    # Cheap integer that changes whenever the clipboard does; None when the
+    # platform has no such counter and the payload has to be grabbed instead
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            return ctypes.windll.user32.GetClipboardSequenceNumber()
+        if sys.platform == "darwin":
+            from AppKit import NSPasteboard
+            return NSPasteboard.generalPasteboard().changeCount()
+    except Exception:
+        pass
+    return None
 
-torch._dynamo.config.cache_size_limit = 64
+class LocalLoadError(Exception):
+    pass
 
 class ModelManager:
     def __init__(self):
         self.models_dir = os.path.join(os.path.expanduser("~"), ".educational_ai_tutor", "models")
         self.config_file = os.path.join(os.path.expanduser("~"), ".educational_ai_tutor", "config.json")
+        self.catalog_file = os.path.join(os.path.expanduser("~"), ".educational_ai_tutor", "cache", "models_catalog.json")
         self.ensure_directories()
         self.config = self.load_config()
+        self.online_cache = (None, False)
+        self.online_cache_ttl = 30
+        self.online_probe_running = False
+        self.size_cache = {}
         
     def ensure_directories(self):
         os.makedirs(self.models_dir, exist_ok=True)
@@ -77,64 +211,176 @@ class ModelManager:
         try:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r') as f:
-                    return json.load(f)
+                    config = json.load(f)
+                # Older configs stored a plain list of names saved under models_dir
+                if isinstance(config.get("downloaded_models"), list):
+                    config["downloaded_models"] = {
+                        name: self.get_legacy_model_path(name) for name in config["downloaded_models"]
+                    }
+                return config
         except:
             pass
-        return {"downloaded_models": [], "last_used_model": None, "offline_mode": False}
+        return {"downloaded_models": {}, "last_used_model": None, "offline_mode": False}
         
     def save_config(self):
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            # Write a temp file and swap it in so a crash never leaves a truncated config
+            tmp_file = self.config_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(self.config, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.config_file)
         except Exception as e:
             print(f"Error saving config: {e}")
             
     def is_online(self):
-        try:
-            urllib.request.urlopen('https://huggingface.co', timeout=5)
+        # Serve the cached probe result; refresh it in the background once stale
+        checked_at, online = self.online_cache
+        if checked_at is None:
+            return self.probe_online()
+        if time.time() - checked_at >= self.online_cache_ttl and not self.online_probe_running:
+            self.online_probe_running = True
+            threading.Thread(target=self.probe_online, daemon=True).start()
+        return online
+        
+    def is_online_cached(self):
+        # Never blocks the UI: before the first probe finishes, assume online and let
+        # the download worker do the real check
+        if self.online_cache[0] is None:
+            if not self.online_probe_running:
+                self.online_probe_running = True
+                threading.Thread(target=self.probe_online, daemon=True).start()
             return True
-        except:
-            return False
-            
-    def get_model_path(self, model_name):
+        return self.is_online()
+        
+    def probe_online(self):
+        try:
+            socket.create_connection(("huggingface.co", 443), timeout=2).close()
+            online = True
+        except OSError:
+            online = False
+        self.online_cache = (time.time(), online)
+        self.online_probe_running = False
+        return online
+            
+    def get_legacy_model_path(self, model_name):
         safe_name = model_name.replace("/", "_").replace("\\", "_")
         return os.path.join(self.models_dir, safe_name)
         
-    def is_model_downloaded(self, model_name):
+    def get_model_path(self, model_name):
+        # Snapshot path inside the HF cache, as recorded at download time
+        model_path = self.config.get("downloaded_models", {}).get(model_name)
+        return model_path or self.get_legacy_model_path(model_name)
+        
+    def get_model_storage_dir(self, model_name):
+        # Snapshot folders only hold symlinks; the blobs live in the repo cache root
         model_path = self.get_model_path(model_name)
-        return os.path.exists(model_path) and os.path.isdir(model_path)
+        repo_dir = os.path.dirname(os.path.dirname(model_path))
+        if os.path.basename(repo_dir).startswith("models--"):
+            return repo_dir
+        return model_path
+        
+    def is_model_up_to_date(self, model_name):
+        # Snapshot folders are named after the commit they were downloaded from, so
+        # comparing that to the Hub's current sha tells us if anything changed
+        storage_dir = self.get_model_storage_dir(model_name)
+        repo_dir_name = os.path.basename(storage_dir)
+        if not repo_dir_name.startswith("models--"):
+            return False
+        repo_id = repo_dir_name[len("models--"):].replace("--", "/")
+        repo_info = self.get_remote_model_info(repo_id)
+        return repo_info is not None and repo_info.sha == os.path.basename(self.get_model_path(model_name))
+        
+    def is_model_downloaded(self, model_name):
+        return os.path.isdir(self.get_model_path(model_name))
         
     def download_model(self, model_name, progress_callback=None):
         try:
+            if self.config.get("offline_mode", False):
+                raise RuntimeError("Offline mode is enabled - disable it in the Model Manager to download models")
+                
             if progress_callback:
                 progress_callback("Checking internet connection...")
                 
             if not self.is_online():
                 raise Exception("No internet connection available")
                 
+            repo_id = self.resolve_download_repo(model_name)
+            
+            # huggingface_hub keeps interrupted blobs as *.incomplete files and continues
+            # them with Range requests, so a cancelled or crashed download resumes here
+            partial_size = self.get_partial_download_size(repo_id)
+            if progress_callback:
+                if partial_size:
+                    progress_callback(f"Resuming {model_name} ({self.format_size(partial_size)} already downloaded)...")
+                else:
+                    progress_callback(f"Downloading {model_name}...")
+                
+            from huggingface_hub import snapshot_download
+            
+            # Report real byte progress by polling the repo's cache folder, which also
+            # counts resumed partial blobs and works with hf_transfer's ranged writers
+            repo_info = self.get_remote_model_info(repo_id)
+            ignore_patterns = self.get_download_ignore_patterns(repo_info)
+            siblings = [
+                sibling for sibling in (repo_info.siblings if repo_info else [])
+                if not any(fnmatch.fnmatch(sibling.rfilename, pattern) for pattern in ignore_patterns)
+            ]
+            total_size = sum(sibling.size or 0 for sibling in siblings)
+            download_done = threading.Event()
+            
+            def report_progress():
+                repo_cache_dir = self.get_repo_cache_dir(repo_id)
+                while not download_done.wait(0.5):
+                    try:
+                        downloaded = self.get_dir_size(repo_cache_dir)
+                    except OSError:
+                        continue
+                    percent = min(100, downloaded * 100 // total_size)
+                    progress_callback(f"Downloading {model_name}: {self.format_size(downloaded)} / "
+                                      f"{self.format_size(total_size)} ({percent}%)", percent)
+                    
+            if progress_callback and total_size:
+                threading.Thread(target=report_progress, daemon=True).start()
+                
+            # Fetch into the HF cache under our models directory and load straight from
+            # the snapshot, so the weights are only written to disk once
+            try:
+                model_path = snapshot_download(
+                    repo_id=repo_id,
+                    cache_dir=self.models_dir,
+                    max_workers=8,
+                    ignore_patterns=ignore_patterns,
+                )
+            finally:
+                download_done.set()
+                
+            # A finished download proves the Hub is reachable
+            self.online_cache = (time.time(), True)
+                
             if progress_callback:
-                progress_callback(f"Downloading {model_name}...")
+                progress_callback(f"Downloaded {model_name}", 100)
                 
-            # Load model which will download it if not cached
+            if siblings:
+                if progress_callback:
+                    progress_callback("Verifying downloaded files...")
+                self.verify_download(model_path, siblings)
+            
+            if progress_callback:
+                progress_callback("Loading downloaded model...")
+                
+            FastModel = import_fast_model()
             model, tokenizer = FastModel.from_pretrained(
-                model_name=model_name,
+                model_name=model_path,
                 dtype=None,
                 max_seq_length=1024,
                 load_in_4bit=True,
                 full_finetuning=False,
             )
             
-            if progress_callback:
-                progress_callback("Saving model locally...")
-            
-            # Save to our local models directory
-            model_path = self.get_model_path(model_name)
-            model.save_pretrained(model_path)
-            tokenizer.save_pretrained(model_path)
-            
             # Update config
-            if model_name not in self.config["downloaded_models"]:
-                self.config["downloaded_models"].append(model_name)
+            self.config["downloaded_models"][model_name] = model_path
             self.config["last_used_model"] = model_name
             self.save_config()
             
@@ -148,6 +394,100 @@ class ModelManager:
                 progress_callback(f"Download failed: {str(e)}")
             raise e
             
+    def get_model_catalog(self):
+        try:
+            with open(self.catalog_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+            
+    def is_model_catalog_stale(self):
+        try:
+            return time.time() - os.path.getmtime(self.catalog_file) >= MODEL_CATALOG_TTL
+        except OSError:
+            return True
+            
+    def refresh_model_catalog(self):
+        try:
+            from huggingface_hub import HfApi
+            models = sorted(
+                model.id for model in HfApi().list_models(author="unsloth", search="gemma-3n")
+                if model.id.endswith("-it")
+            )
+            if not models:
+                return
+            os.makedirs(os.path.dirname(self.catalog_file), exist_ok=True)
+            tmp_file = self.catalog_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(models, f)
+            os.replace(tmp_file, self.catalog_file)
+        except Exception as e:
+            print(f"Could not refresh model catalog: {e}")
+            
+    def get_remote_model_info(self, repo_id):
+        try:
+            from huggingface_hub import HfApi
+            return HfApi().model_info(repo_id, files_metadata=True)
+        except Exception as e:
+            print(f"Could not fetch model info for {repo_id}: {e}")
+            return None
+            
+    def get_download_ignore_patterns(self, repo_info):
+        # Skip export formats the loader never reads; pickle weights are only
+        # dropped when the repo also ships safetensors
+        patterns = list(DOWNLOAD_IGNORE_PATTERNS)
+        if repo_info and any(sibling.rfilename.endswith(".safetensors") for sibling in repo_info.siblings):
+            patterns += ["*.bin", "*.pt", "*.pth"]
+        return patterns
+        
+    def verify_download(self, model_path, siblings):
+        for sibling in siblings:
+            if not sibling.lfs:
+                continue
+            file_path = os.path.join(model_path, sibling.rfilename)
+            if self.file_sha256(file_path) != sibling.lfs.sha256:
+                raise RuntimeError(f"Checksum mismatch for {sibling.rfilename} - delete the model and download it again")
+                
+    def file_sha256(self, path):
+        with open(path, 'rb') as f:
+            # file_digest hashes through OpenSSL without creating a bytes object per chunk
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            digest = hashlib.sha256()
+            buffer = memoryview(bytearray(1 << 20))
+            while n := f.readinto(buffer):
+                digest.update(buffer[:n])
+            return digest.hexdigest()
+            
+    def get_repo_cache_dir(self, repo_id):
+        return os.path.join(self.models_dir, "models--" + repo_id.replace("/", "--"))
+        
+    def get_partial_download_size(self, repo_id):
+        blobs_dir = os.path.join(self.get_repo_cache_dir(repo_id), "blobs")
+        try:
+            with os.scandir(blobs_dir) as entries:
+                return sum(entry.stat().st_size for entry in entries if entry.name.endswith(".incomplete"))
+        except OSError:
+            return 0
+            
+    def resolve_download_repo(self, model_name):
+        # Prefer pre-quantized 4-bit mirrors so full-precision shards are never fetched
+        # and no on-device quantization pass is needed at load time
+        if model_name in BNB4_ALIASES:
+            return BNB4_ALIASES[model_name]
+        if model_name.endswith("bnb-4bit"):
+            return model_name
+            
+        from huggingface_hub import hf_hub_download
+        for suffix in ("-unsloth-bnb-4bit", "-bnb-4bit"):
+            candidate = model_name + suffix
+            try:
+                hf_hub_download(repo_id=candidate, filename="config.json", cache_dir=self.models_dir)
+                return candidate
+            except Exception:
+                continue
+        return model_name
+        
     def load_local_model(self, model_name, progress_callback=None):
         try:
             model_path = self.get_model_path(model_name)
@@ -158,6 +498,7 @@ class ModelManager:
             if progress_callback:
                 progress_callback(f"Loading local model {model_name}...")
                 
+            FastModel = import_fast_model()
             model, tokenizer = FastModel.from_pretrained(
                 model_name=model_path,
                 dtype=None,
@@ -177,31 +518,31 @@ class ModelManager:
         except Exception as e:
             if progress_callback:
                 progress_callback(f"Failed to load local model: {str(e)}")
-            raise e
+            raise LocalLoadError(str(e)) from e
             
     def load_model(self, model_name, progress_callback=None):
         # Try local first, then download if needed
         if self.is_model_downloaded(model_name):
             try:
                 return self.load_local_model(model_name, progress_callback)
-            except Exception as e:
+            except LocalLoadError as e:
+                if self.config.get("offline_mode", False):
+                    raise
                 print(f"Failed to load local model, will try to download: {e}")
                 
         # If local loading failed or model not downloaded, try to download
         return self.download_model(model_name, progress_callback)
         
     def get_downloaded_models(self):
-        return self.config.get("downloaded_models", [])
+        return list(self.config.get("downloaded_models", {}))
         
     def delete_model(self, model_name):
         try:
-            model_path = self.get_model_path(model_name)
+            model_path = self.get_model_storage_dir(model_name)
             if os.path.exists(model_path):
-                import shutil
                 shutil.rmtree(model_path)
                 
-            if model_name in self.config["downloaded_models"]:
-                self.config["downloaded_models"].remove(model_name)
+            self.config["downloaded_models"].pop(model_name, None)
                 
             if self.config["last_used_model"] == model_name:
                 self.config["last_used_model"] = None
@@ -214,47 +555,132 @@ class ModelManager:
             
     def get_model_size(self, model_name):
         try:
-            model_path = self.get_model_path(model_name)
+            model_path = self.get_model_storage_dir(model_name)
             if not os.path.exists(model_path):
                 return 0
                 
-            total_size = 0
-            for dirpath, dirnames, filenames in os.walk(model_path):
-                for filename in filenames:
-                    file_path = os.path.join(dirpath, filename)
-                    total_size += os.path.getsize(file_path)
+            # Only rewalk the tree when the directory (or a direct subdirectory) changed
+            mtime = os.stat(model_path).st_mtime
+            with os.scandir(model_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        mtime = max(mtime, entry.stat(follow_symlinks=False).st_mtime)
+            cached = self.size_cache.get(model_path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+                
+            total_size = self.get_dir_size(model_path)
+            self.size_cache[model_path] = (mtime, total_size)
             return total_size
         except:
             return 0
             
+    def get_dir_size(self, path):
+        # DirEntry carries the dirent type, so only regular files cost a stat call.
+        # Snapshot entries are symlinks to blobs already counted, so they are skipped.
+        total_size = 0
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    total_size += self.get_dir_size(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total_size += entry.stat(follow_symlinks=False).st_size
+        return total_size
+            
     def format_size(self, size_bytes):
         if size_bytes == 0:
             return "0 B"
         size_names = ["B", "KB", "MB", "GB", "TB"]
-        import math
-        i = int(math.floor(math.log(size_bytes, 1024)))
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2)
+        i = min((int(size_bytes).bit_length() - 1) // 10, len(size_names) - 1)
+        s = round(size_bytes / (1 << (i * 10)), 2)
         return f"{s} {size_names[i]}"
 
 class TokenManager:
     def __init__(self):
+        # Keep tiktoken's BPE file in our own folder instead of the temp dir, so it
+        # survives reboots and can be pre-copied for offline installs
+        tiktoken_cache_dir = os.environ.setdefault(
+            "TIKTOKEN_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".educational_ai_tutor", "cache", "tiktoken"))
         try:
+            os.makedirs(tiktoken_cache_dir, exist_ok=True)
+            import tiktoken
             self.encoder = tiktoken.get_encoding("cl100k_base")
+            self.encoder.encode_ordinary("warm up")
         except:
             self.encoder = None
-        self.max_context_tokens = 32000
-        self.image_tokens = 256
-        self.audio_tokens_per_second = 6.25
+        self.max_context_tokens = TOKEN_RATES["context_limit"]
+        self.image_tokens = TOKEN_RATES["image"]
+        self.audio_tokens_per_second = TOKEN_RATES["audio_per_sec"]
+        # Counts for recently seen strings; most recounts (typing, refreshes) see the
+        # same context and history again
+        self.token_cache = collections.OrderedDict()
+        self.token_cache_size = 4096
+        # Context recounts run on TOKEN_POOL while the UI thread counts other text
+        self.token_cache_lock = threading.Lock()
         
     def count_text_tokens(self, text):
         if not text:
             return 0
-        if self.encoder:
-            return len(self.encoder.encode(str(text)))
-        else:
+        if not self.encoder:
             return len(str(text).split()) * 1.3
             
+        text = str(text)
+        # Key long strings by digest so the cache doesn't pin large documents
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest() if len(text) > 4096 else text
+        with self.token_cache_lock:
+            count = self.token_cache.get(key)
+            if count is not None:
+                self.token_cache.move_to_end(key)
+                return count
+                
+        count = len(self.encoder.encode_ordinary(text))
+        with self.token_cache_lock:
+            self.token_cache[key] = count
+            if len(self.token_cache) > self.token_cache_size:
+                self.token_cache.popitem(last=False)
+        return count
+            
+    def recount_text_tokens(self, old_text, old_count, new_text):
+        # Re-encode only the edited span, widened to safe token boundaries so the
+        # words around the edit tokenize the same way
+        if not self.encoder or not old_text or not new_text:
+            return self.count_text_tokens(new_text)
+            
+        limit = min(len(old_text), len(new_text))
+        start = 0
+        while start < limit and old_text[start] == new_text[start]:
+            start += 1
+        end = 0
+        while end < limit - start and old_text[-1 - end] == new_text[-1 - end]:
+            end += 1
+            
+        # The boundary check looks one character either side, so stay inside the
+        # text both versions share
+        start = self.find_token_boundary(new_text, start - 2, backward=True)
+        new_end = self.find_token_boundary(new_text, len(new_text) - end + 1)
+        old_end = new_end - len(new_text) + len(old_text)
+        
+        if new_end - start > len(new_text) // 2:
+            return self.count_text_tokens(new_text)
+        return (old_count + len(self.encoder.encode_ordinary(new_text[start:new_end]))
+                - len(self.encoder.encode_ordinary(old_text[start:old_end])))
+        
+    def find_token_boundary(self, text, pos, backward=False):
+        # A single space between a non-space and a word character always starts a
+        # new token, so encoding can be split there without changing the count
+        while 0 < pos < len(text):
+            if text[pos] == ' ' and not text[pos - 1].isspace() and pos + 1 < len(text) and text[pos + 1].isalnum():
+                return pos
+            pos += -1 if backward else 1
+        return max(0, min(pos, len(text)))
+        
+    def count_text_tokens_batch(self, texts):
+        if not self.encoder:
+            return [self.count_text_tokens(text) for text in texts]
+        # Encoded in parallel on tiktoken's Rust threads with the GIL released
+        encoded = self.encoder.encode_ordinary_batch([str(text) for text in texts], num_threads=os.cpu_count() or 4)
+        return [len(ids) if text else 0 for text, ids in zip(texts, encoded)]
+            
     def count_image_tokens(self, image_count):
         return image_count * self.image_tokens
         
@@ -272,6 +698,42 @@ class TokenManager:
         else:
             return '#dc3545'
 
+class PageSelection:
+    # One flag byte per page, so iteration is already in page order and never needs sorting
+    def __init__(self, total_pages):
+        self.flags = bytearray(total_pages + 1)
+        self.count = 0
+        
+    def add(self, page_num):
+        if not self.flags[page_num]:
+            self.flags[page_num] = 1
+            self.count += 1
+            
+    def add_range(self, start, end):
+        self.flags[start:end + 1] = b'\x01' * (end + 1 - start)
+        self.count = self.flags.count(1)
+        
+    def remove(self, page_num):
+        if self.flags[page_num]:
+            self.flags[page_num] = 0
+            self.count -= 1
+            
+    def clear(self):
+        self.flags = bytearray(len(self.flags))
+        self.count = 0
+        
+    def __contains__(self, page_num):
+        return 0 < page_num < len(self.flags) and self.flags[page_num] == 1
+        
+    def __len__(self):
+        return self.count
+        
+    def __iter__(self):
+        page_num = self.flags.find(1, 1)
+        while page_num != -1:
+            yield page_num
+            page_num = self.flags.find(1, page_num + 1)
+
 class DocumentViewer:
     def __init__(self, parent, doc_path, callback=None):
         self.parent = parent
@@ -280,6 +742,7 @@ class DocumentViewer:
         self.file_ext = os.path.splitext(doc_path)[1].lower()
         
         if self.file_ext == '.pdf':
+            import fitz
             self.doc = fitz.open(doc_path)
             self.total_pages = len(self.doc)
             self.is_pdf = True
@@ -289,8 +752,12 @@ class DocumentViewer:
             self.is_pdf = False
             
         self.current_page = 0
-        self.selected_pages = set()
+        self.selected_pages = PageSelection(self.total_pages)
         self.zoom_level = 1.0
+        self.photo = None
+        self.render_cache = collections.OrderedDict()
+        self.render_cache_size = 8
+        self.load_text_cache()
         
         self.setup_viewer()
         self.display_content()
@@ -377,25 +844,51 @@ class DocumentViewer:
             
     def display_pdf_page(self):
         if 0 <= self.current_page < self.total_pages:
-            page = self.doc[self.current_page]
-            mat = fitz.Matrix(self.zoom_level, self.zoom_level)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("ppm")
-            
-            img = Image.open(io.BytesIO(img_data))
-            self.photo = ImageTk.PhotoImage(img)
+            # Only rasterize pages that aren't already in the LRU render cache
+            cache_key = (self.current_page, round(self.zoom_level, 2))
+            photo = self.render_cache.get(cache_key)
+            if photo is None:
+                import fitz
+                page = self.doc[self.current_page]
+                mat = fitz.Matrix(self.zoom_level, self.zoom_level)
+                pix = page.get_pixmap(matrix=mat, alpha=False)
+                img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", pix.stride, 1)
+                
+                # Recycle the evicted PhotoImage when it has the same size instead of
+                # allocating a fresh Tk image for every page turn
+                recycled = None
+                if len(self.render_cache) >= self.render_cache_size:
+                    _, evicted = self.render_cache.popitem(last=False)
+                    if evicted is not self.photo and (evicted.width(), evicted.height()) == img.size:
+                        recycled = evicted
+                if recycled is not None:
+                    recycled.paste(img)
+                    photo = recycled
+                else:
+                    photo = ImageTk.PhotoImage(img)
+                self.render_cache[cache_key] = photo
+            else:
+                self.render_cache.move_to_end(cache_key)
+            self.photo = photo
             
             self.canvas.delete("all")
             self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
             self.canvas.configure(scrollregion=self.canvas.bbox("all"))
             
-            page_selected = (self.current_page + 1) in self.selected_pages
-            bg_color = '#ffffcc' if page_selected else 'white'
-            self.canvas.configure(bg=bg_color)
+            self.update_page_highlight()
             
             self.page_var.set(f"{self.current_page + 1} / {self.total_pages}")
             self.update_selection_label()
             
+    def update_page_highlight(self):
+        page_selected = (self.current_page + 1) in self.selected_pages
+        bg_color = '#ffffcc' if page_selected else 'white'
+        self.canvas.configure(bg=bg_color)
+        
+    def refresh_selection(self):
+        self.update_page_highlight()
+        self.update_selection_label()
+            
     def display_text_content(self):
         try:
             content = self.extract_text()
@@ -406,36 +899,65 @@ class DocumentViewer:
             self.text_display.delete(1.0, tk.END)
             self.text_display.insert(1.0, f"Error loading document: {str(e)}")
             
+    def load_text_cache(self):
+        # Re-opening a textbook skips PDF/DOCX extraction for any text seen before
+        self.page_text = {}
+        self.document_text = None
+        self.text_cache_dirty = False
+        self.text_cache_file = None
+        if not self.is_pdf and self.file_ext != '.docx':
+            return
+        try:
+            st = os.stat(self.doc_path)
+            key = hashlib.sha1(f"{os.path.abspath(self.doc_path)}|{st.st_mtime_ns}|{st.st_size}".encode('utf-8')).hexdigest()
+            self.text_cache_file = os.path.join(DOCUMENT_CACHE_DIR, key + ".json")
+            with open(self.text_cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            self.page_text = cached.get("pages", {})
+            self.document_text = cached.get("text")
+        except:
+            pass
+            
+    def save_text_cache(self):
+        if not self.text_cache_dirty or not self.text_cache_file:
+            return
+        self.text_cache_dirty = False
+        IO_POOL.submit(self.write_text_cache, self.text_cache_file,
+                       {"pages": dict(self.page_text), "text": self.document_text})
+        
+    def write_text_cache(self, cache_file, cached):
+        try:
+            os.makedirs(DOCUMENT_CACHE_DIR, exist_ok=True)
+            tmp_file = cache_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(cached, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            print(f"Could not cache document text: {e}")
+            
     def extract_text(self):
         try:
             if self.file_ext == '.pdf':
                 if self.selected_pages:
-                    text_content = ""
-                    for page_num in sorted(self.selected_pages):
-                        page = self.doc[page_num - 1]
-                        text_content += f"\n--- Page {page_num} ---\n"
-                        text_content += page.get_text()
-                    return text_content
+                    page_nums = self.selected_pages
                 else:
-                    text_content = ""
-                    for page_num in range(len(self.doc)):
-                        page = self.doc[page_num]
-                        text_content += f"\n--- Page {page_num + 1} ---\n"
-                        text_content += page.get_text()
-                    return text_content
+                    page_nums = range(1, len(self.doc) + 1)
+                return "".join(self.iter_page_text(page_nums))
                     
             elif self.file_ext == '.docx':
-                doc = docx.Document(self.doc_path)
-                return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+                if self.document_text is None:
+                    self.document_text = self.extract_docx_text()
+                    self.text_cache_dirty = True
+                return self.document_text
                 
-            elif self.file_ext in ['.txt', '.md', '.py', '.js', '.html', '.css', '.xml', '.json']:
+            elif self.file_ext in TEXT_DOCUMENT_EXTENSIONS:
                 with open(self.doc_path, 'r', encoding='utf-8', errors='ignore') as f:
                     return f.read()
                     
             elif self.file_ext == '.rtf':
-                with open(self.doc_path, 'r', encoding='utf-8', errors='ignore') as f:
+                with open(self.doc_path, 'rb') as f:
                     rtf_content = f.read()
-                    return re.sub(r'\\[a-z]+\d*\s?|\{|\}', '', rtf_content)
+                return RTF_STRIP_RE.sub(b'', rtf_content).decode('utf-8', 'ignore')
                     
             else:
                 with open(self.doc_path, 'r', encoding='utf-8', errors='ignore') as f:
@@ -444,6 +966,42 @@ class DocumentViewer:
         except Exception as e:
             return f"Error extracting text: {str(e)}"
             
+    def extract_docx_text(self):
+        # Stream word/document.xml directly rather than building python-docx's object model
+        paragraphs = []
+        runs = []
+        # w:pPr holds the paragraph's tab stop definitions, which are also w:tab elements
+        in_properties = 0
+        with zipfile.ZipFile(self.doc_path) as archive:
+            with archive.open('word/document.xml') as xml_file:
+                for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+                    if elem.tag == DOCX_PARAGRAPH_PROPERTIES_TAG:
+                        in_properties += 1 if event == 'start' else -1
+                    elif event == 'start' or in_properties:
+                        continue
+                    elif elem.tag == DOCX_TEXT_TAG:
+                        runs.append(elem.text or '')
+                    elif elem.tag == DOCX_TAB_TAG:
+                        runs.append('\t')
+                    elif elem.tag in DOCX_BREAK_TAGS:
+                        runs.append('\n')
+                    elif elem.tag == DOCX_PARAGRAPH_TAG:
+                        paragraphs.append(''.join(runs))
+                        runs.clear()
+                        elem.clear()
+        return '\n'.join(paragraphs)
+        
+    def iter_page_text(self, page_nums):
+        for page_num in page_nums:
+            yield f"\n--- Page {page_num} ---\n"
+            key = str(page_num)
+            text = self.page_text.get(key)
+            if text is None:
+                text = self.doc[page_num - 1].get_text("text", sort=False)
+                self.page_text[key] = text
+                self.text_cache_dirty = True
+            yield text
+            
     def open_in_system(self):
         try:
             system = platform.system()
@@ -482,7 +1040,7 @@ class DocumentViewer:
             self.selected_pages.remove(page_num)
         else:
             self.selected_pages.add(page_num)
-        self.display_pdf_page()
+        self.refresh_selection()
         
     def select_range(self):
         if not self.is_pdf:
@@ -494,10 +1052,9 @@ class DocumentViewer:
             start = max(1, min(start, self.total_pages))
             end = max(start, min(end, self.total_pages))
             
-            for page_num in range(start, end + 1):
-                self.selected_pages.add(page_num)
+            self.selected_pages.add_range(start, end)
                 
-            self.display_pdf_page()
+            self.refresh_selection()
         except ValueError:
             messagebox.showerror("Error", "Please enter valid page numbers")
             
@@ -505,7 +1062,7 @@ class DocumentViewer:
         if not self.is_pdf:
             return
         self.selected_pages.clear()
-        self.display_pdf_page()
+        self.refresh_selection()
         
     def use_selected(self):
         if not self.is_pdf or not self.selected_pages:
@@ -513,13 +1070,15 @@ class DocumentViewer:
             return
             
         text_content = self.extract_text()
+        self.save_text_cache()
         if self.callback:
-            self.callback(text_content, list(sorted(self.selected_pages)))
+            self.callback(text_content, list(self.selected_pages))
             
         self.window.destroy()
         
     def use_all_text(self):
         text_content = self.extract_text()
+        self.save_text_cache()
         if self.callback:
             if self.is_pdf:
                 all_pages = list(range(1, self.total_pages + 1))
@@ -533,7 +1092,7 @@ class DocumentViewer:
         if not self.is_pdf:
             return
         if self.selected_pages:
-            pages_list = sorted(self.selected_pages)
+            pages_list = list(self.selected_pages)
             if len(pages_list) <= 5:
                 pages_str = ", ".join(map(str, pages_list))
             else:
@@ -636,7 +1195,7 @@ class ModelManagerViewer:
         ttk.Button(close_frame, text="Close", command=self.window.destroy).pack(side=tk.RIGHT)
         
     def update_connection_status(self):
-        if self.model_manager.is_online():
+        if self.model_manager.is_online_cached():
             self.status_label.config(text="🟢 Online", foreground='green')
         else:
             self.status_label.config(text="🔴 Offline", foreground='red')
@@ -648,38 +1207,42 @@ class ModelManagerViewer:
             self.app_callback("offline_mode_changed")
             
     def refresh_display(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        # Add downloaded models
+        # Build every row before touching the tree so it is rebuilt in one pass
         downloaded_models = self.model_manager.get_downloaded_models()
         last_used = self.model_manager.config.get("last_used_model")
+        sizes = {model_name: self.model_manager.get_model_size(model_name) for model_name in downloaded_models}
         
+        rows = []
         for model_name in downloaded_models:
-            size = self.model_manager.get_model_size(model_name)
-            size_str = self.model_manager.format_size(size)
-            
+            size_str = self.model_manager.format_size(sizes[model_name])
             status = "Active" if model_name == last_used else "Downloaded"
+            rows.append((model_name, size_str, status, ""))
             
-            self.tree.insert('', tk.END, values=(model_name, size_str, status, ""))
+        # Clear existing items
+        self.tree.delete(*self.tree.get_children())
+        
+        # Add downloaded models
+        for row in rows:
+            self.tree.insert('', tk.END, values=row)
             
         # Update info
-        self.update_info()
+        self.update_info(sizes)
         self.update_connection_status()
         
-    def update_info(self):
+    def update_info(self, sizes=None):
         self.info_text.delete(1.0, tk.END)
         
         downloaded_models = self.model_manager.get_downloaded_models()
-        total_size = sum(self.model_manager.get_model_size(model) for model in downloaded_models)
+        if sizes is None:
+            sizes = {model: self.model_manager.get_model_size(model) for model in downloaded_models}
+        total_size = sum(sizes.values())
         
         info_text = f"📊 OFFLINE MODEL STATUS\n\n"
         info_text += f"Downloaded Models: {len(downloaded_models)}\n"
         info_text += f"Total Storage Used: {self.model_manager.format_size(total_size)}\n"
         info_text += f"Models Directory: {self.model_manager.models_dir}\n"
         info_text += f"Offline Mode: {'Enabled' if self.offline_var.get() else 'Disabled'}\n"
-        info_text += f"Internet Connection: {'Available' if self.model_manager.is_online() else 'Not Available'}\n\n"
+        info_text += f"Internet Connection: {'Available' if self.model_manager.is_online_cached() else 'Not Available'}\n\n"
         
         if self.offline_var.get():
             info_text += "⚠️ Offline Mode is enabled. Only local models will be used.\n"
@@ -717,47 +1280,71 @@ class ModelManagerViewer:
         if messagebox.askyesno("Confirm Delete", 
                               f"Are you sure you want to delete the model '{model_name}'?\n\n"
                               "This will free up disk space but you'll need to download it again to use it."):
-            if self.model_manager.delete_model(model_name):
-                messagebox.showinfo("Success", f"Model '{model_name}' deleted successfully.")
-                self.refresh_display()
-                if self.app_callback:
-                    self.app_callback("model_deleted", model_name)
-            else:
-                messagebox.showerror("Error", f"Failed to delete model '{model_name}'.")
-                
+            # Removing multi-GB model folders can take a while; keep Tk responsive
+            self.window.config(cursor='watch')
+            future = IO_POOL.submit(self.model_manager.delete_model, model_name)
+            future.add_done_callback(lambda f: self.window.after(0, self.delete_complete, model_name, f.result()))
+            
+    def delete_complete(self, model_name, deleted):
+        self.window.config(cursor='')
+        if deleted:
+            messagebox.showinfo("Success", f"Model '{model_name}' deleted successfully.")
+            self.refresh_display()
+            if self.app_callback:
+                self.app_callback("model_deleted", model_name)
+        else:
+            messagebox.showerror("Error", f"Failed to delete model '{model_name}'.")
+            
     def clean_cache(self):
         if messagebox.askyesno("Clean Cache", 
                               "This will clean up temporary files and unused model cache.\n\n"
                               "Continue?"):
-            try:
-                # Clean up transformers cache
-                import transformers
-                cache_dir = transformers.file_utils.default_cache_path
-                if os.path.exists(cache_dir):
-                    import shutil
-                    shutil.rmtree(cache_dir, ignore_errors=True)
-                    
-                # Force garbage collection
-                gc.collect()
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-                    
-                messagebox.showinfo("Success", "Cache cleaned successfully.")
-                self.refresh_display()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to clean cache: {str(e)}")
+            self.window.config(cursor='watch')
+            future = IO_POOL.submit(self.remove_cache_files)
+            future.add_done_callback(lambda f: self.window.after(0, self.clean_cache_complete, f.exception()))
+            
+    def remove_cache_files(self):
+        # Clean up transformers cache
+        import transformers
+        cache_dir = transformers.file_utils.default_cache_path
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            
+        # Force garbage collection
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            
+    def clean_cache_complete(self, error):
+        self.window.config(cursor='')
+        if error:
+            messagebox.showerror("Error", f"Failed to clean cache: {str(error)}")
+        else:
+            messagebox.showinfo("Success", "Cache cleaned successfully.")
+            self.refresh_display()
 
 class ModelDownloadDialog:
+    MODELS = (
+        "unsloth/gemma-3n-E4B-it",
+        "unsloth/gemma-3n-8B-it",
+        "unsloth/gemma-3n-5B-it",
+        "unsloth/gemma-3n-2B-it",
+    )
+    
     def __init__(self, parent, model_manager, refresh_callback):
         self.parent = parent
         self.model_manager = model_manager
         self.refresh_callback = refresh_callback
+        # Holds only the latest progress update; the Tk side drains it on a timer
+        self.progress_queue = queue.Queue(maxsize=1)
+        self.downloading = False
         self.setup_dialog()
         
     def setup_dialog(self):
         self.dialog = tk.Toplevel(self.parent)
         self.dialog.title("📥 Download Model")
-        self.dialog.geometry("500x400")
+        self.dialog.geometry("500x440")
         self.dialog.resizable(False, False)
         self.dialog.transient(self.parent)
         self.dialog.grab_set()
@@ -777,13 +1364,13 @@ class ModelDownloadDialog:
         
         self.model_var = tk.StringVar(value="unsloth/gemma-3n-E4B-it")
         
-        models = [
-            "unsloth/gemma-3n-E4B-it",
-            "unsloth/gemma-3n-8B-it", 
-            "unsloth/gemma-3n-5B-it",
-            "unsloth/gemma-3n-2B-it"
-        ]
-        
+        # Offer the cached Hub catalog when we have one; a stale catalog is refreshed in
+        # the background and picked up the next time the dialog opens
+        models = self.model_manager.get_model_catalog() or self.MODELS
+        if (self.model_manager.is_model_catalog_stale() and not self.model_manager.config.get("offline_mode", False)
+                and self.model_manager.is_online_cached()):
+            threading.Thread(target=self.model_manager.refresh_model_catalog, daemon=True).start()
+            
         for model in models:
             ttk.Radiobutton(model_frame, text=model, variable=self.model_var, value=model).pack(anchor=tk.W, pady=2)
             
@@ -795,14 +1382,18 @@ class ModelDownloadDialog:
         self.custom_entry = ttk.Entry(custom_frame, width=30)
         self.custom_entry.pack(side=tk.LEFT, padx=5)
         
+        self.force_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(model_frame, text="Force re-download even if up to date",
+                       variable=self.force_var).pack(anchor=tk.W, pady=2)
+        
         # Progress
         progress_frame = ttk.LabelFrame(self.dialog, text="Progress", padding="10")
         progress_frame.pack(fill=tk.X, padx=20, pady=10)
         
-        self.progress_var = tk.StringVar(value="Ready to download...")
-        ttk.Label(progress_frame, textvariable=self.progress_var).pack(anchor=tk.W)
+        self.progress_label = ttk.Label(progress_frame, text="Ready to download...")
+        self.progress_label.pack(anchor=tk.W)
         
-        self.progress_bar = ttk.Progressbar(progress_frame, mode='indeterminate')
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', maximum=100)
         self.progress_bar.pack(fill=tk.X, pady=5)
         
         # Buttons
@@ -822,42 +1413,81 @@ class ModelDownloadDialog:
                 messagebox.showwarning("Invalid Input", "Please enter a custom model name.")
                 return
                 
-        if not self.model_manager.is_online():
+        if not self.model_manager.is_online_cached():
             messagebox.showerror("No Internet", "Internet connection required to download models.")
             return
             
+        check_revision = False
         if self.model_manager.is_model_downloaded(model_name):
             if not messagebox.askyesno("Model Exists", f"Model '{model_name}' is already downloaded.\n\nRe-download?"):
                 return
+            check_revision = not self.force_var.get()
                 
         self.download_btn.config(state=tk.DISABLED)
-        self.progress_bar.start()
+        self.progress_bar['value'] = 0
+        self.downloading = True
+        self.poll_progress()
         
         def download_thread():
             try:
-                def progress_callback(message):
-                    self.dialog.after(0, lambda: self.progress_var.set(message))
+                def progress_callback(message, percent=None):
+                    try:
+                        self.progress_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    try:
+                        self.progress_queue.put_nowait((message, percent))
+                    except queue.Full:
+                        pass
                     
+                if check_revision:
+                    progress_callback("Checking for a newer revision...")
+                    if self.model_manager.is_model_up_to_date(model_name):
+                        self.dialog.after_idle(self.download_up_to_date, model_name)
+                        return
+                        
                 self.model_manager.download_model(model_name, progress_callback)
                 
-                self.dialog.after(0, self.download_complete)
+                self.dialog.after_idle(self.download_complete)
                 
             except Exception as e:
-                self.dialog.after(0, lambda: self.download_error(str(e)))
+                self.dialog.after_idle(self.download_error, str(e))
                 
         threading.Thread(target=download_thread, daemon=True).start()
         
+    def poll_progress(self):
+        try:
+            self.update_progress(*self.progress_queue.get_nowait())
+        except queue.Empty:
+            pass
+        # Wait out the interval, then drain only once Tk has no other events pending
+        if self.downloading and self.dialog.winfo_exists():
+            self.dialog.after(50, self.dialog.after_idle, self.poll_progress)
+            
+    def update_progress(self, message, percent=None):
+        self.progress_label.config(text=message)
+        if percent is not None:
+            self.progress_bar['value'] = percent
+            
     def download_complete(self):
-        self.progress_bar.stop()
-        self.progress_var.set("Download completed successfully!")
+        self.downloading = False
+        self.progress_bar['value'] = 100
+        self.progress_label.config(text="Download completed successfully!")
         messagebox.showinfo("Success", "Model downloaded and saved for offline use!")
         if self.refresh_callback:
             self.refresh_callback()
         self.dialog.destroy()
         
+    def download_up_to_date(self, model_name):
+        self.downloading = False
+        self.progress_label.config(text="Model is already up to date.")
+        messagebox.showinfo("Up to Date", f"Model '{model_name}' is already at the latest revision - nothing was downloaded.")
+        self.dialog.destroy()
+        
     def download_error(self, error_message):
-        self.progress_bar.stop()
-        self.progress_var.set(f"Download failed: {error_message}")
+        self.downloading = False
+        self.progress_bar['value'] = 0
+        self.progress_label.config(text=f"Download failed: {error_message}")
         self.download_btn.config(state=tk.NORMAL)
         messagebox.showerror("Download Failed", f"Failed to download model:\n\n{error_message}")
 
@@ -889,14 +1519,17 @@ class HelpViewer:
         self.help_notebook = ttk.Notebook(self.window)
         self.help_notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        self.setup_overview_tab()
-        self.setup_offline_tab()
-        self.setup_getting_started_tab()
-        self.setup_educational_tools_tab()
-        self.setup_multimodal_tab()
-        self.setup_token_management_tab()
-        self.setup_tips_tab()
-        self.setup_troubleshooting_tab()
+        # Tabs only register their page name here; the text widget is built the first
+        # time a tab is shown, so opening help doesn't lay out all eight pages
+        self.tab_content = {}
+        self.help_font = tkfont.Font(self.window, family='Arial', size=10)
+        self.help_notebook.bind("<<NotebookTabChanged>>", self.load_tab_content)
+        
+        for title, name in HELP_TABS:
+            frame = ttk.Frame(self.help_notebook)
+            self.help_notebook.add(frame, text=title)
+            self.tab_content[str(frame)] = name
+        self.load_tab_content()
         
         # Close button
         close_frame = ttk.Frame(self.window)
@@ -904,1706 +1537,68 @@ class HelpViewer:
         
         ttk.Button(close_frame, text="Close Help", command=self.window.destroy).pack(side=tk.RIGHT)
         
-    def setup_overview_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🏠 Overview")
-        
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    def load_tab_content(self, event=None):
+        tab = self.help_notebook.select()
+        name = self.tab_content.pop(tab, None)
+        if name is None:
+            return
+            
+        # Help pages are static, so use a plain Text without an undo stack
+        frame = self.help_notebook.nametowidget(tab)
+        text_widget = tk.Text(frame, wrap=tk.NONE, font=self.help_font, undo=False, autoseparators=False, maxundo=0)
+        scrollbar = ttk.Scrollbar(frame, command=text_widget.yview)
+        text_widget.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+        text_widget.pack(fill=tk.BOTH, expand=True, padx=(10, 0), pady=10)
+        text_widget.insert(1.0, load_help_text(name))
+        text_widget.config(wrap=tk.WORD, state=tk.DISABLED)
         
-        content = """
-🎓 EDUCATIONAL AI TUTOR - MULTIMODAL LEARNING ASSISTANT
-
-Welcome to your comprehensive AI-powered learning companion! This application combines advanced AI with educational tools to create a personalized learning environment.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🌟 KEY FEATURES:
-
-📚 Intelligent Tutoring
-• Powered by Gemma 3n language model
-• Adaptive responses based on your learning level
-• Subject-specific expertise across multiple domains
-• Step-by-step explanations and guided learning
 
-🌐 Complete Offline Operation
-• Download AI models once, use forever without internet
-• Total privacy - all processing happens on your device
-• Perfect for remote areas or limited connectivity
-• No data usage after initial model download
-
-🖼️ Multimodal Support
-• Text conversations with advanced AI
-• Image analysis and discussion
-• Audio recording and file import
-• Screen capture for visual problems
-• Document analysis (PDF, DOCX, TXT, and more)
-
-🎯 Educational Tools
-• Concept explanation and mapping
-• Homework assistance with hints (not answers!)
-• Quiz generation and adaptive practice
-• Assessment creation and skill evaluation
-• Progress tracking and study recommendations
-
-🔧 Smart Features
-• 32K token context window with intelligent management
-• Smart clipboard integration
-• Real-time token usage monitoring
-• Chat history management and export
-• Resizable interface with multiple panels
-• Advanced model management for offline use
-
-═══════════════════════════════════════════════════════════════════════════════
-
-💡 LEARNING PHILOSOPHY:
-
-This tutor is designed to HELP YOU LEARN, not give you answers. It focuses on:
-• Understanding concepts deeply
-• Developing problem-solving skills
-• Building confidence through practice
-• Encouraging critical thinking
-• Providing personalized guidance
-
-🔒 PRIVACY & INDEPENDENCE:
-
-Your learning is completely private and independent:
-• All AI processing happens on YOUR device only
-• No data ever sent to external servers
-• Works completely offline after initial setup
-• Perfect for sensitive educational content
-• Student privacy fully protected
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎯 WHO CAN BENEFIT:
-
-✅ Students (Elementary through Graduate level)
-✅ Homeschool families
-✅ Teachers seeking AI assistance
-✅ Self-learners and lifelong learners
-✅ Anyone wanting personalized education support
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🚀 GET STARTED:
-
-1. Download an AI model using the Model Manager (🤖 button)
-2. Choose your study mode in the Educational Tools panel
-3. Upload study materials or enable general subject settings
-4. Start asking questions and exploring!
-5. Everything works offline after model download!
-
-Continue to the Offline Mode tab for complete setup instructions.
-        """
+class ChatHistoryViewer:
+    def __init__(self, parent, chat_history, token_manager):
+        self.parent = parent
+        self.chat_history = chat_history
+        self.token_manager = token_manager
+        self.rendered_rows = {}
+        self.rendered_count = 0
+        self.first_rendered = 0
+        self.last_rendered_entry = None
+        self.last_entry_tokens = 0
+        self.total_tokens = 0
+        self.setup_viewer()
+        self.update_display()
         
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
+    def setup_viewer(self):
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Chat History & Token Usage")
+        self.window.geometry("700x600")
+        self.window.resizable(True, True)
+        self.window.minsize(500, 400)
         
-    def setup_offline_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🌐 Offline Mode")
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
         
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        ttk.Button(toolbar, text="Clear History", command=self.clear_history).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Export History", command=self.export_history).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Refresh", command=self.update_display).pack(side=tk.LEFT, padx=5)
         
-        content = """
-🌐 OFFLINE MODE - COMPLETE PRIVACY & INDEPENDENCE
-
-Experience true privacy and freedom with offline AI that runs entirely on your device!
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🚀 WHY OFFLINE MATTERS:
-
-🔒 Complete Privacy
-• Your conversations never leave your device
-• No data sent to external servers
-• Student information stays completely secure
-• Perfect for sensitive educational content
-
-⚡ Always Available
-• Works without internet connection
-• Perfect for remote areas or unreliable connections
-• No downtime or server issues
-• Ideal for schools with limited connectivity
-
-🎯 Superior Performance
-• Faster responses (no network latency)
-• Consistent performance regardless of internet speed
-• No bandwidth usage after initial download
-• Works on planes, trains, and anywhere offline
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🤖 MODEL MANAGER GUIDE
-
-📥 Downloading Models:
-
-1. Click "🤖 Model Manager" button (top of interface)
-2. Click "📥 Download Model" in the manager window
-3. Choose from available Gemma 3n models:
-   • gemma-3n-E4B-it (Recommended - balanced performance)
-   • gemma-3n-8B-it (Largest - best quality, needs more RAM)
-   • gemma-3n-5B-it (Good balance of size and performance)
-   • gemma-3n-2B-it (Smallest - fastest, lower quality)
-4. Click "📥 Download" and wait for completion
-5. Model is now available for offline use!
-
-📱 Model Sizes & Requirements:
-• 2B Model: ~1.5GB disk space, 4GB+ RAM recommended
-• 4B Model: ~2.5GB disk space, 6GB+ RAM recommended  
-• 5B Model: ~3.5GB disk space, 8GB+ RAM recommended
-• 8B Model: ~5GB disk space, 12GB+ RAM recommended
-
-🎛️ Model Management:
-• View all downloaded models and their sizes
-• Switch between models instantly
-• Delete unused models to free space
-• Monitor total storage usage
-• Clean cache and temporary files
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚙️ OFFLINE MODE SETTINGS
-
-🌐 Offline Mode Toggle:
-• Enable: Only use locally downloaded models
-• Disable: Download models automatically if needed
-• Status shown in Model Manager interface
-• Setting saved between sessions
-
-🔄 Connection Status:
-• Green 🟢: Internet available
-• Red 🔴: Offline (no internet)
-• Model Manager shows current connection status
-• Works regardless of internet availability
-
-📊 Storage Management:
-• Models stored in: ~/.educational_ai_tutor/models/
-• Config saved in: ~/.educational_ai_tutor/config.json
-• View total storage usage in Model Manager
-• Clean cache to free temporary files
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎯 OFFLINE WORKFLOW
-
-📋 First-Time Setup:
-1. Connect to internet (for initial download)
-2. Open Model Manager (🤖 button)
-3. Download your preferred model (E4B-it recommended)
-4. Enable "🌐 Offline Mode" checkbox
-5. Close Model Manager - you're now fully offline!
-
-🔄 Daily Usage:
-1. Start the application (no internet needed)
-2. Model loads automatically from local storage
-3. All features work exactly the same
-4. Chat, upload documents, use educational tools
-5. Everything processed locally on your device
-
-📚 Educational Benefits:
-• Students can study anywhere without internet
-• Teachers can use in classrooms without WiFi concerns
-• Complete privacy for sensitive educational content
-• No data usage - perfect for limited internet plans
-• Consistent performance regardless of network
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🛠️ TECHNICAL DETAILS
-
-🏗️ Architecture:
-• Models run using Unsloth + Transformers locally
-• 4-bit quantization for memory efficiency
-• CPU and GPU acceleration support
-• Optimized for consumer hardware
-
-💾 Storage Structure:
-~/.educational_ai_tutor/
-├── models/
-│   ├── unsloth_gemma-3n-E4B-it/
-│   └── unsloth_gemma-3n-8B-it/
-└── config.json
-
-🎛️ Configuration Options:
-• downloaded_models: List of available local models
-• last_used_model: Automatically load this model
-• offline_mode: Force offline-only operation
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚠️ TROUBLESHOOTING OFFLINE ISSUES
-
-❌ "No models downloaded" Error:
-1. Connect to internet temporarily
-2. Open Model Manager
-3. Download at least one model
-4. Enable offline mode
-5. Disconnect internet - will work offline
-
-❌ Model won't load offline:
-1. Check Model Manager - ensure model shows as "Downloaded"
-2. Try loading a different model
-3. Clear cache and restart application
-4. Re-download model if corrupted
-
-❌ "Internet required" message:
-1. Enable "🌐 Offline Mode" in Model Manager
-2. Ensure you have downloaded models locally
-3. Restart application after enabling offline mode
-
-💡 Optimization Tips:
-• Download models during off-peak hours
-• Use external drive for models if space limited
-• 8GB+ RAM recommended for larger models
-• SSD storage recommended for faster loading
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎓 EDUCATIONAL USE CASES
-
-🏫 Classroom Deployment:
-• Install on multiple computers with one internet download
-• Students work offline during lessons
-• No network congestion issues
-• Perfect for computer labs
-
-📱 Personal Study:
-• Study on planes, trains, remote locations
-• No data usage concerns
-• Complete privacy for personal learning
-• Works during internet outages
-
-🌍 Global Education:
-• Serve areas with limited internet
-• Reduce digital divide
-• Educational access without connectivity requirements
-• Perfect for developing regions
-
-Remember: Once downloaded, the AI tutor works completely offline with full functionality - it's like having a personal AI teacher that never needs the internet!
-        """
+        self.show_all_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text=f"Show all (default: last {HISTORY_VIEW_LIMIT})", variable=self.show_all_var,
+                       command=self.toggle_show_all).pack(side=tk.LEFT, padx=5)
         
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
+        self.tree = ttk.Treeview(self.window, columns=('Role', 'Tokens', 'Content'), show='tree headings')
+        self.tree.heading('#0', text='#')
+        self.tree.heading('Role', text='Role')
+        self.tree.heading('Tokens', text='Tokens')
+        self.tree.heading('Content', text='Content Preview')
         
-    def setup_getting_started_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🚀 Getting Started")
+        self.tree.column('#0', width=50)
+        self.tree.column('Role', width=80)
+        self.tree.column('Tokens', width=80)
+        self.tree.column('Content', width=400)
         
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        content = """
-🚀 GETTING STARTED GUIDE
-
-Follow these steps to begin your learning journey:
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📋 STEP 1: DOWNLOAD AI MODEL (First Time Only)
-
-🤖 Model Setup:
-1. Click the "🤖 Model Manager" button (top of interface)
-2. Click "📥 Download Model" in the manager window
-3. Select recommended model: "unsloth/gemma-3n-E4B-it"
-4. Click "📥 Download" and wait for completion (~2-3GB download)
-5. Enable "🌐 Offline Mode" checkbox for complete privacy
-6. Close Model Manager - you're now ready for offline use!
-
-💡 Model Recommendations:
-• For most users: gemma-3n-E4B-it (balanced performance)
-• For powerful computers: gemma-3n-8B-it (best quality)
-• For older computers: gemma-3n-2B-it (fastest)
-
-⚠️ One-time internet required: After download, works completely offline!
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📋 STEP 2: FAMILIARIZE WITH INTERFACE
-   • Left panel: Educational Tools
-   • Center panel: Chat and Input
-   • Right panel: Context & History
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚙️ STEP 2: CHOOSE YOUR STUDY MODE
-
-🎯 Option A: Study Materials Only (Recommended for specific coursework)
-• Keep "Use General Subject Settings" unchecked
-• Upload your textbooks, notes, or study materials
-• AI will focus exclusively on your uploaded content
-
-🎯 Option B: General Subject Settings
-• Check "Use General Subject Settings"
-• Select subject, grade level, and difficulty
-• AI will provide general knowledge in that subject area
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📄 STEP 3: UPLOAD STUDY MATERIALS (if using Option A)
-
-1. Click "Add Document" button
-2. Select your files (supports many formats):
-   • PDF files (with page selection)
-   • Word documents (.docx)
-   • Text files (.txt, .md)
-   • Code files (.py, .js, .css, etc.)
-   • Web files (.html, .xml, .json)
-
-3. Use the Document Viewer:
-   • Navigate through pages (for PDFs)
-   • Select specific pages or use all content
-   • Zoom in/out for better readability
-   • Click "Use All Text" or "Use Selected"
-
-═══════════════════════════════════════════════════════════════════════════════
-
-💬 STEP 4: ADD MULTIMEDIA CONTENT (Optional)
-
-📸 Images:
-• Click "Add Image" to select image files
-• Use screen capture for screenshots
-• Copy images to clipboard for auto-detection
-
-🎵 Audio:
-• Click "Add Audio" to import existing audio files
-• Click "Record Audio" for live recording
-• Supports MP3, WAV, M4A, AAC, OGG, FLAC, WMA formats
-
-📄 Documents:
-• Click "Add Document" for study materials
-• Supports PDF, DOCX, TXT, MD, RTF, HTML, code files
-• Use Document Viewer for page selection
-
-💬 STEP 5: START LEARNING
-
-1. Type your question in the message input area
-2. Use Ctrl+Enter to send (or click Send button)
-3. Watch the AI provide detailed explanations
-4. Ask follow-up questions to deepen understanding
-
-Examples of good questions:
-• "Explain the concept of photosynthesis in simple terms"
-• "Can you break down this math problem step by step?"
-• "What are the key themes in this chapter?"
-• "Create a concept map for cellular respiration"
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎓 STEP 6: USE EDUCATIONAL TOOLS
-
-Instead of typing questions, try the pre-built educational tools:
-
-📚 Learning Tools:
-• "Explain Concept" - Get detailed explanations
-• "Create Concept Map" - Visual learning aids
-
-📝 Homework Helper:
-• "Get Hints" - Guidance without giving answers
-• "Step-by-Step Guide" - Detailed problem-solving
-• "Find Similar Problems" - Practice variations
-
-🧪 Quiz & Practice:
-• "Generate Quiz" - Custom quizzes based on material
-• "Adaptive Practice" - Progressive difficulty sessions
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔍 MONITORING YOUR PROGRESS
-
-• Check the Token Usage panel for context tracking
-• Use "Chat History" to review past conversations
-• Monitor "Progress Overview" in Educational Tools
-• Export chat history for later review
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⌨️ KEYBOARD SHORTCUTS
-
-• Ctrl+Enter: Send message
-• Escape: Stop AI generation
-• Mouse wheel: Scroll through chat history
-• Click pages in PDF viewer to select them
-
-═══════════════════════════════════════════════════════════════════════════════
-
-💡 FIRST SESSION TIPS:
-
-1. Start with simple questions to get comfortable
-2. Upload one document at a time initially
-3. Monitor token usage to understand limits
-4. Experiment with different educational tools
-5. Ask the AI to explain its own responses if unclear
-
-Ready to learn? Head to the Educational Tools tab for more detailed feature explanations!
-        """
-        
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
-        
-    def setup_educational_tools_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🎓 Educational Tools")
-        
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        content = """
-🎓 EDUCATIONAL TOOLS DETAILED GUIDE
-
-The Educational Tools panel provides specialized learning functions designed to enhance your study experience.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚙️ STUDY SETTINGS
-
-🎯 Study Mode Selection:
-• Materials Only: Focus on your uploaded documents
-• General Settings: Use AI's broad knowledge base
-• Toggle anytime to switch between modes
-
-📊 Subject Configuration (when General Settings enabled):
-• Subject: Choose from 14+ subject areas
-• Grade Level: Elementary → Graduate
-• Difficulty: Beginner → Expert
-• These settings customize AI responses to your level
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📚 LEARNING TOOLS
-
-◯ Explain Concept
-PURPOSE: Get comprehensive explanations of key topics
-WHEN TO USE: When you need to understand a new concept
-WHAT IT DOES:
-• Identifies important concepts in your subject/materials
-• Provides clear, level-appropriate definitions
-• Gives real-world examples and applications
-• Breaks down complex ideas step-by-step
-• Highlights common misconceptions
-• Suggests memory techniques
-• Provides practice questions
-
-EXAMPLE: Click this for a physics concept and get detailed explanations of force, acceleration, practical examples, common mistakes, and practice problems.
-
-◈ Create Concept Map
-PURPOSE: Visual learning through structured concept relationships
-WHEN TO USE: When you need to see how ideas connect
-WHAT IT DOES:
-• Creates hierarchical concept maps
-• Shows relationships between main and sub-topics
-• Includes connections to related concepts
-• Provides prerequisites and follow-up topics
-• Uses tree-structure visualization
-
-EXAMPLE: Creates a visual map showing "Photosynthesis" connected to "Light Reactions," "Calvin Cycle," "Chloroplasts," etc.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📝 HOMEWORK HELPER
-
-⚠️ IMPORTANT: These tools provide GUIDANCE, not direct answers!
-
-? Get Hints
-PURPOSE: Gentle guidance without spoiling the learning process
-WHEN TO USE: When stuck on homework problems
-WHAT IT PROVIDES:
-• Guiding questions to help you think
-• Relevant concepts to review
-• Similar example problems
-• Step-by-step approaches (without answers)
-• Common mistakes to avoid
-
-EXAMPLE: For a math problem, gives you questions like "What formula might apply here?" rather than showing the solution.
-
-∞ Step-by-Step Guide
-PURPOSE: Learn the problem-solving process
-WHEN TO USE: When you need to understand methodology
-WHAT IT PROVIDES:
-• Detailed step-by-step breakdowns
-• Explanation of WHY each step is taken
-• Reasoning behind each action
-• Multiple examples of the same process
-• Connections between steps
-
-EXAMPLE: Shows "Step 1: Identify the type of equation (and why this matters), Step 2: Apply the quadratic formula (and when to use it)..."
-
-◎ Find Similar Problems
-PURPOSE: Practice with variations of the same concept
-WHEN TO USE: When you want more practice
-WHAT IT PROVIDES:
-• 3-5 similar practice problems
-• Same concept with different numbers/contexts
-• Progressive difficulty levels
-• Solution approaches for each
-• Concept reinforcement notes
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🧪 QUIZ & PRACTICE
-
-Quiz Options:
-• Questions: 1-20 (customizable)
-• Types: Multiple Choice, True/False, Fill in Blank, Short Answer, Mixed
-
-◦ Generate Quiz
-PURPOSE: Test your knowledge
-WHEN TO USE: Before exams or to check understanding
-WHAT IT PROVIDES:
-• Custom questions based on your materials
-• Multiple choice options with explanations
-• Correct answer identification
-• Detailed explanations for all options
-• Progressive difficulty levels
-
-↻ Adaptive Practice
-PURPOSE: Personalized learning progression
-WHEN TO USE: For systematic skill building
-WHAT IT PROVIDES:
-• Starts with easier confidence-building questions
-• Gradually increases difficulty
-• Immediate feedback after each question
-• Questions that build on previous answers
-• Customized pacing based on performance
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📊 ASSESSMENT & REVIEW
-
-✎ Create Practice Test
-PURPOSE: Exam preparation
-FEATURES:
-• Mix of question types
-• Comprehensive topic coverage
-• Detailed answer keys
-• Point values and time suggestions
-• Study tips for difficult concepts
-
-⌚ Timed Assessment
-PURPOSE: Simulate real exam conditions
-FEATURES:
-• 20-minute timed sessions
-• Strategic question distribution (60% quick recall, 30% problem-solving, 10% analysis)
-• Time management guidance
-• Pacing strategies
-• Performance scoring
-
-◦ Skill Evaluation
-PURPOSE: Comprehensive skill assessment
-FEATURES:
-• Four-area evaluation framework
-• Diagnostic questions for each skill level
-• Performance indicators (Beginner/Intermediate/Advanced)
-• Targeted improvement recommendations
-• Next steps for skill development
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔍 STUDY ANALYSIS
-
-◯ Get Study Recommendations
-PURPOSE: Personalized improvement strategies
-PROVIDES:
-• Areas needing more focus
-• Effective study techniques
-• Methods to deepen understanding
-• Next topics to explore
-• Information retention strategies
-
-◦ Identify My Strengths
-PURPOSE: Recognize and build on natural abilities
-ANALYZES:
-• Learning style preferences
-• Areas of highest engagement
-• Question patterns and preferences
-• Problem-solving approaches
-• Natural talents and inclinations
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📈 PROGRESS OVERVIEW
-
-The mini statistics display shows:
-• Current study mode and settings
-• Study materials token count
-• Chat activity summary
-• Questions asked vs responses received
-• Total conversation tokens
-
-💡 PRO TIP: Use this regularly to track your learning journey and adjust study strategies!
-        """
-        
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
-        
-    def setup_multimodal_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🖼️ Multimodal Features")
-        
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        content = """
-🖼️ MULTIMODAL FEATURES GUIDE
-
-The AI tutor supports multiple input types beyond text, making learning more interactive and comprehensive.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📄 DOCUMENT SUPPORT
-
-🔍 Supported Formats:
-• PDF files (.pdf) - Full viewer with page selection
-• Word documents (.docx) - Text extraction
-• Text files (.txt, .md) - Direct import
-• Rich text (.rtf) - Formatted text
-• Web files (.html, .css, .js) - Code analysis
-• Programming files (.py, .xml, .json) - Syntax understanding
-
-📋 Document Viewer Features:
-
-For PDF Files:
-• Navigation: ◀ ▶ buttons to move between pages
-• Zoom: 🔍+ and 🔍- for better readability
-• Page Selection: Click on pages to select/deselect them
-• Range Selection: Enter page numbers (e.g., "1 to 5")
-• Visual Feedback: Selected pages highlighted in yellow
-
-For All Files:
-• System Integration: "Open in System" button
-• Text Preview: See content before importing
-• Selective Import: Choose specific sections
-• Token Counting: See token usage before adding
-
-📚 How to Use Documents:
-1. Click "Add Document" in the main interface
-2. Select your file using the file browser
-3. Use the Document Viewer to preview and select content
-4. Click "Use All Text" or "Use Selected" to import
-5. The content appears in the Context panel
-6. Ask questions about the imported material
-
-💡 BEST PRACTICES:
-• Upload one document at a time initially
-• For large PDFs, select only relevant pages
-• Monitor token usage when importing large texts
-• Use descriptive file names for organization
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🖼️ IMAGE SUPPORT
-
-📷 Image Input Methods:
-• File Selection: Click "Add Image" to browse for files
-• Clipboard Auto-Detection: Copy images and they're automatically added
-• Screen Capture: Click "Capture Screen" for selective screenshots
-
-🎯 Supported Image Types:
-• Photos (.jpg, .jpeg) - Pictures of textbooks, whiteboards, notes
-• Graphics (.png, .gif, .bmp) - Diagrams, charts, screenshots
-• Any visual content relevant to your studies
-
-📋 Image Processing:
-• Automatic token allocation (256 tokens per image)
-• Visual analysis and description capabilities
-• Integration with text conversations
-• Support for multiple images per conversation
-
-💡 EDUCATIONAL USE CASES:
-• Photograph textbook pages or problems
-• Capture whiteboard content from classes
-• Screenshot online resources or websites
-• Include diagrams and charts in discussions
-• Share visual homework problems
-
-⚠️ Note: Images are stored locally and processed for educational analysis.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎤 AUDIO SUPPORT
-
-🔊 Audio Input Methods:
-• File Selection: Click "Add Audio" to browse for existing audio files
-• Real-time Recording: Click "Record Audio" for live recording
-• Multiple format support for imported files
-
-🎵 Supported Audio Formats:
-• MP3 (.mp3) - Most common format
-• WAV (.wav) - Uncompressed audio
-• M4A (.m4a) - Apple/iTunes format
-• AAC (.aac) - Advanced Audio Codec
-• OGG (.ogg) - Open source format
-• FLAC (.flac) - Lossless compression
-• WMA (.wma) - Windows Media Audio
-
-📋 Audio File Import:
-1. Click "Add Audio" button
-2. Select one or more audio files from your computer
-3. Files are analyzed for duration and format
-4. Token count calculated automatically
-5. Files added to attachment list
-
-🔊 Audio Recording Features:
-• Real-time recording with visual feedback
-• Automatic file conversion and storage
-• Duration tracking and token calculation
-• Integration with text conversations
-
-📋 How to Use Audio Recording:
-1. Click "Record Audio" to start recording
-2. Speak your question or provide audio content
-3. Button changes to "Stop Recording" with red status
-4. Click again to stop and save the recording
-5. Audio is automatically added to your attachments
-
-⏱️ Token Usage:
-• Calculated at 6.25 tokens per second
-• Real-time duration tracking for recordings
-• Automatic duration analysis for imported files
-• Displayed in attachment summary
-
-💡 EDUCATIONAL APPLICATIONS:
-• Import lecture recordings for analysis
-• Add audio notes and explanations
-• Include pronunciation examples for language learning
-• Process recorded problem explanations
-• Analyze audio from educational videos
-• Record yourself explaining concepts for AI feedback
-• Import podcast segments or audio books
-• Add voice memos and study recordings
-
-🎵 Technical Details:
-• Sample Rate: 44.1 kHz
-• Format: MP3 compression
-• Channels: Mono recording
-• Quality: Optimized for speech recognition
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📱 SCREEN CAPTURE
-
-🖥️ Screen Capture Features:
-• Full-screen overlay with crosshair cursor
-• Click and drag to select specific areas
-• Real-time selection preview
-• Automatic crop and save functionality
-
-📋 How to Use Screen Capture:
-1. Click "Capture Screen" button
-2. Application minimizes temporarily
-3. Click and drag to select the area you want
-4. Release mouse to capture the selection
-5. Application returns with captured image added
-
-⌨️ Keyboard Controls:
-• Escape: Cancel capture and return to application
-• Mouse: Click, drag, and release to select area
-
-💡 EDUCATIONAL USE CASES:
-• Capture online quiz questions or problems
-• Screenshot educational websites or resources
-• Grab specific diagrams from digital textbooks
-• Capture error messages for troubleshooting
-• Save visual content from educational videos
-
-🎯 Selection Tips:
-• Be precise with your selection rectangle
-• Capture just the relevant content
-• Avoid including unnecessary UI elements
-• Consider image clarity and readability
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔄 SMART CLIPBOARD INTEGRATION
-
-📋 Automatic Detection:
-• Monitors clipboard for new images
-• Automatically adds copied images
-• Provides notifications when images are detected
-• Seamless integration with other applications
-
-💡 Workflow Integration:
-• Copy images from web browsers
-• Paste screenshots from other applications
-• Import images from photo editing software
-• Seamless workflow with research activities
-
-⚙️ How It Works:
-• Runs in background continuously
-• Checks clipboard every second
-• Detects new image content
-• Adds images with system notifications
-• Prevents duplicate additions
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📊 ATTACHMENT MANAGEMENT
-
-📝 Attachment Tracking:
-• Real-time token count for all attachments
-• Type categorization (images, audio, documents)
-• Total token usage calculation
-• Clear attachment summary display
-
-🗂️ Organization Features:
-• Automatic file naming and storage
-• Temporary file management
-• Cleanup on application exit
-• Attachment history tracking
-
-💡 OPTIMIZATION TIPS:
-• Monitor total attachment tokens
-• Remove unnecessary attachments
-• Use selective document imports
-• Balance multimodal input with token limits
-
-Remember: All multimodal inputs are designed to enhance your learning experience while maintaining focus on educational outcomes!
-        """
-        
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
-        
-    def setup_token_management_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🔢 Token Management")
-        
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        content = """
-🔢 TOKEN MANAGEMENT COMPREHENSIVE GUIDE
-
-Understanding and managing tokens is crucial for optimal performance with the AI tutor.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📖 WHAT ARE TOKENS?
-
-🔤 Token Basics:
-• Tokens are units of text that the AI processes
-• Roughly 1 token = 0.75 words in English
-• Numbers, punctuation, and spaces count as tokens
-• The AI has a 32,000 token context limit
-
-💡 Examples:
-• "Hello world!" = ~2 tokens
-• "The quick brown fox" = ~4 tokens
-• "Photosynthesis is the process..." = ~5 tokens
-
-⚡ Why Tokens Matter:
-• They determine how much context the AI can remember
-• Larger inputs require more tokens
-• Token limits prevent information overload
-• Efficient token use = better performance
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📊 TOKEN USAGE BREAKDOWN
-
-📝 Text Tokens:
-• Your input messages
-• AI responses
-• Context from uploaded documents
-• Chat history
-
-🖼️ Image Tokens:
-• Each image = 256 tokens (fixed)
-• Regardless of image size or complexity
-• Counted when image is added to conversation
-
-🎵 Audio Tokens:
-• Calculated at 6.25 tokens per second
-• 1 minute of audio = ~375 tokens
-• Based on audio duration, not content
-
-📄 Document Tokens:
-• Variable based on text length
-• Calculated using advanced tokenization
-• Shown before importing documents
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎛️ TOKEN DISPLAY INTERFACE
-
-📈 Token Usage Panel (Top of Interface):
-Shows real-time breakdown:
-• Total: Current total tokens / 32,000 limit (percentage)
-• Remaining: How many tokens are still available
-• Input: Tokens from your current input + context
-• History: Tokens from recent chat messages
-
-🚨 Color-Coded Warnings:
-• 🟢 Green (0-50%): Safe usage levels
-• 🟡 Yellow (50-75%): Monitor usage
-• 🟠 Orange (75-90%): Approach caution
-• 🔴 Red (90%+): Near limit, take action
-
-📊 Individual Token Counters:
-• Input field: Shows tokens as you type
-• Context panel: Updates when editing context
-• History panel: Shows tokens per message
-• Attachments: Displays token cost
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚙️ TOKEN MANAGEMENT CONTROLS
-
-🎚️ Max Output Tokens:
-• Controls AI response length
-• Range: 128 - 2,048 tokens
-• Default: 512 tokens
-• Shorter = quicker responses, Longer = detailed responses
-
-📜 Chat History Messages:
-• Controls how many previous messages to include
-• Range: 1 - 50 messages
-• Default: 10 messages
-• More history = better context, More tokens used
-
-🔄 Refresh Functions:
-• "Refresh Tokens": Recalculate all token counts
-• "Chat History": View detailed token breakdown
-• Auto-updates when content changes
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🛠️ OPTIMIZATION STRATEGIES
-
-📉 Reducing Token Usage:
-
-1. History Management:
-   • Reduce "Messages to include" count
-   • Clear chat history periodically
-   • Export important conversations before clearing
-
-2. Context Optimization:
-   • Use only relevant sections of documents
-   • Edit context to remove unnecessary parts
-   • Clear context when switching topics
-
-3. Input Efficiency:
-   • Be concise but clear in questions
-   • Avoid repeating information
-   • Use educational tool buttons instead of long prompts
-
-4. Attachment Management:
-   • Remove unnecessary images/audio
-   • Use selective PDF page imports
-   • Monitor attachment token totals
-
-📈 Maximizing Token Efficiency:
-
-1. Smart Document Use:
-   • Import only relevant pages/sections
-   • Use Document Viewer's selection features
-   • Preview token count before importing
-
-2. Conversation Strategy:
-   • Start with specific questions
-   • Build on previous responses
-   • Use follow-up questions effectively
-
-3. Educational Tool Usage:
-   • Use pre-built prompts for common tasks
-   • Educational tools are optimized for token efficiency
-   • Combine multiple learning objectives
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚠️ MANAGING TOKEN LIMITS
-
-🚨 When Approaching Limits:
-
-1. Immediate Actions:
-   • Clear old chat history
-   • Remove unnecessary context
-   • Reduce max output tokens temporarily
-
-2. Context Strategies:
-   • Save important context to files
-   • Use "Save Context" before clearing
-   • Load context as needed for specific topics
-
-3. Conversation Management:
-   • Export chat history before clearing
-   • Start fresh conversations for new topics
-   • Use "Clear Chat" for complete reset
-
-📋 Best Practices:
-
-✅ DO:
-• Monitor token usage regularly
-• Use educational tools efficiently
-• Save important conversations
-• Clear context between topics
-• Import only relevant document sections
-
-❌ DON'T:
-• Upload entire textbooks at once
-• Keep unnecessary attachments
-• Ignore token warnings
-• Use maximum settings unnecessarily
-• Repeat information in conversations
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔍 TROUBLESHOOTING TOKEN ISSUES
-
-❌ "Token Limit Exceeded" Error:
-1. Check total token usage in display
-2. Clear some chat history
-3. Remove large context sections
-4. Reduce attachment count
-5. Try again with reduced input
-
-🐛 Inaccurate Token Counts:
-1. Click "Refresh Tokens" button
-2. Restart conversation if needed
-3. Check for hidden characters in context
-4. Clear and reload problematic content
-
-⚡ Performance Issues:
-1. Keep total tokens under 75% of limit
-2. Use shorter output token limits
-3. Manage history more aggressively
-4. Consider breaking large tasks into smaller parts
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📚 ADVANCED TOKEN TECHNIQUES
-
-🎯 Efficient Learning Workflows:
-
-1. Topic-Based Sessions:
-   • Dedicate conversations to single topics
-   • Clear context between subjects
-   • Use educational tools for structured learning
-
-2. Progressive Learning:
-   • Start with basic concepts (fewer tokens)
-   • Build complexity gradually
-   • Use previous responses as context
-
-3. Document Strategies:
-   • Process large documents in sections
-   • Use page selection for relevant content
-   • Combine related sections efficiently
-
-💡 Pro Tips:
-• Educational tool prompts are pre-optimized
-• Context editing can significantly reduce tokens
-• Regular token monitoring prevents issues
-• Save important insights before clearing
-
-Remember: Effective token management enhances your learning experience while maintaining AI performance!
-        """
-        
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
-        
-    def setup_tips_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="💡 Tips & Best Practices")
-        
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        content = """
-💡 TIPS & BEST PRACTICES
-
-Master the Educational AI Tutor with these proven strategies and techniques.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎯 EFFECTIVE LEARNING STRATEGIES
-
-📚 Question Formulation:
-
-✅ GOOD Questions:
-• "Explain the concept of photosynthesis and why it's important"
-• "Break down this quadratic equation step by step"
-• "What are the main themes in Chapter 3 and how do they connect?"
-• "Create a concept map for cellular respiration"
-• "What's the difference between mitosis and meiosis?"
-
-❌ AVOID:
-• "Do my homework" (too vague)
-• "What's the answer to problem 5?" (seeking answers, not understanding)
-• "Tell me everything about history" (too broad)
-• Single word questions without context
-
-🎓 Learning Progression:
-1. Start with basic concept explanations
-2. Ask for examples and real-world applications
-3. Request practice problems or quizzes
-4. Seek connections between concepts
-5. Test understanding with assessments
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📋 STUDY SESSION OPTIMIZATION
-
-⏰ Session Planning:
-
-1. Focused Sessions (30-60 minutes):
-   • Choose one subject/topic per session
-   • Upload relevant materials at the start
-   • Use educational tools systematically
-   • End with quiz or assessment
-
-2. Review Sessions (15-30 minutes):
-   • Load previous context
-   • Ask for concept summaries
-   • Request practice questions
-   • Identify areas needing more work
-
-3. Assessment Sessions (45-90 minutes):
-   • Use timed assessments and practice tests
-   • Focus on comprehensive evaluation
-   • Request study recommendations
-   • Plan next learning steps
-
-🎯 Pre-Session Checklist:
-□ Clear previous context if changing topics
-□ Upload relevant study materials
-□ Set appropriate subject/grade settings
-□ Monitor token usage from the start
-□ Have specific learning objectives
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📚 DOCUMENT MANAGEMENT STRATEGIES
-
-📄 Efficient Document Use:
-
-1. Textbook Strategy:
-   • Upload one chapter at a time
-   • Use page selection for specific topics
-   • Focus on key concepts and examples
-   • Combine with educational tools
-
-2. Note Organization:
-   • Convert handwritten notes to text files
-   • Upload study guides and summaries
-   • Include problem sets and solutions
-   • Organize by topic or date
-
-3. Multi-Source Learning:
-   • Combine textbook + lecture notes + assignments
-   • Use selective imports for each source
-   • Monitor token usage across sources
-   • Create comprehensive context gradually
-
-💡 Document Best Practices:
-• Name files descriptively
-• Use PDF page selection effectively
-• Preview content before importing
-• Save context frequently
-• Clear and reload for new topics
-
-🎵 Audio Best Practices:
-• Use MP3 or WAV formats for best compatibility
-• Keep audio files under 10 minutes for optimal processing
-• Import lecture recordings in segments for better analysis
-• Record in quiet environments for better quality
-• Use descriptive file names for organization
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔧 TECHNICAL OPTIMIZATION
-
-⚡ Performance Tips:
-
-1. Token Management:
-   • Keep total usage under 75% of limit
-   • Use 256-512 token outputs for most tasks
-   • Clear history every 20-30 exchanges
-   • Monitor attachment token costs
-
-2. Response Quality:
-   • Be specific in questions
-   • Provide context when needed
-   • Use educational tools for structured tasks
-   • Ask follow-up questions for clarification
-
-3. Interface Usage:
-   • Use keyboard shortcuts (Ctrl+Enter, Escape)
-   • Organize panels for your workflow
-   • Save important conversations
-   • Export chat history regularly
-
-🎛️ Settings Optimization:
-• Set grade level accurately for appropriate responses
-• Choose difficulty level honestly for best results
-• Adjust max output tokens based on task complexity
-• Use history message count strategically
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎓 SUBJECT-SPECIFIC STRATEGIES
-
-🔬 STEM Subjects (Math, Science, Engineering):
-• Upload problem sets and work through solutions
-• Request step-by-step explanations
-• Use concept mapping for complex topics
-• Generate practice problems for repetition
-• Focus on understanding WHY, not just HOW
-
-📚 Humanities (History, Literature, Philosophy):
-• Upload reading materials and primary sources
-• Request thematic analysis and connections
-• Use essay structure guidance
-• Ask for historical context and significance
-• Generate discussion questions
-
-🗣️ Languages (English, Foreign Languages):
-• Upload text excerpts for analysis
-• Request grammar explanations and examples
-• Practice with conversation scenarios
-• Use vocabulary building exercises
-• Focus on practical application
-
-💼 Applied Subjects (Business, Economics, etc.):
-• Upload case studies and real-world examples
-• Request practical application scenarios
-• Use problem-solving frameworks
-• Generate situational practice problems
-• Connect theory to current events
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🚀 ADVANCED TECHNIQUES
-
-🎯 Multi-Modal Learning:
-• Combine text, images, and audio for complex topics
-• Import existing audio files (lectures, recordings, etc.)
-• Use screen capture for online resources
-• Record yourself explaining concepts for AI feedback
-• Include diagrams and charts in discussions
-
-📈 Progressive Skill Building:
-1. Assessment Phase: Use skill evaluation tools
-2. Foundation Phase: Focus on basic concepts
-3. Application Phase: Practice with varied problems
-4. Integration Phase: Connect multiple concepts
-5. Mastery Phase: Teach back to the AI
-
-🔄 Iterative Learning:
-• Start with broad overview questions
-• Dive deeper into specific areas
-• Return to connections and relationships
-• Test understanding with assessments
-• Identify gaps and repeat cycle
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚠️ COMMON PITFALLS TO AVOID
-
-❌ Don't:
-• Use AI as a simple answer generator
-• Upload massive documents without selection
-• Ignore token warnings
-• Ask for direct homework answers
-• Skip understanding checks
-
-✅ Do:
-• Focus on learning processes
-• Manage context and tokens actively
-• Use educational tools systematically
-• Ask for explanations and reasoning
-• Test your understanding regularly
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🏆 SUCCESS INDICATORS
-
-You're using the AI tutor effectively when:
-✅ You understand concepts better after sessions
-✅ You can explain topics to others
-✅ You're asking deeper, more sophisticated questions
-✅ You're making connections between different concepts
-✅ You feel more confident in your subject knowledge
-✅ You're using multiple educational tools naturally
-✅ You can solve similar problems independently
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📱 WORKFLOW INTEGRATION
-
-🔗 Daily Learning Routine:
-1. Morning: Review previous session notes
-2. During Study: Use AI for concept clarification
-3. After Classes: Upload new materials for analysis
-4. Evening: Generate quizzes for self-testing
-5. Weekly: Use assessment tools for progress tracking
-
-🎯 Exam Preparation:
-1. Upload all relevant materials
-2. Create comprehensive concept maps
-3. Generate practice tests and quizzes
-4. Use timed assessments for practice
-5. Request study recommendations
-6. Focus on identified weak areas
-
-Remember: The AI tutor is most effective when you actively engage with the learning process rather than passively consuming information!
-        """
-        
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
-        
-    def setup_troubleshooting_tab(self):
-        frame = ttk.Frame(self.help_notebook)
-        self.help_notebook.add(frame, text="🔧 Troubleshooting")
-        
-        text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=('Arial', 10))
-        text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        content = """
-🔧 TROUBLESHOOTING GUIDE
-
-Solutions for common issues and technical problems with the Educational AI Tutor.
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🚨 STARTUP ISSUES
-
-❌ Problem: "Model loading failed" error
-🔧 Solutions:
-1. Check internet connection (required for initial model download)
-2. Ensure sufficient disk space (2-4 GB needed)
-3. Restart the application
-4. Check if firewall is blocking downloads
-5. Try running as administrator (Windows) or with sudo (Linux)
-
-❌ Problem: Application won't start
-🔧 Solutions:
-1. Verify Python installation (3.8+ required)
-2. Install missing dependencies manually:
-   pip install torch transformers pillow numpy sounddevice soundfile pyperclip PyMuPDF python-docx tiktoken unsloth
-3. Check for system compatibility
-4. Review error messages in console/terminal
-
-❌ Problem: Slow model loading
-🔧 Expected Behavior:
-• First launch: 2-5 minutes (downloading model)
-• Subsequent launches: 30-60 seconds
-• GPU systems: Faster loading
-• CPU-only systems: Slower but functional
-
-═══════════════════════════════════════════════════════════════════════════════
-
-💬 CONVERSATION ISSUES
-
-❌ Problem: AI responses are cut off or incomplete
-🔧 Solutions:
-1. Increase "Max Output Tokens" setting (try 1024 or 1536)
-2. Check if generation was stopped accidentally
-3. Reduce input length to allow more output space
-4. Clear some chat history to free up context
-
-❌ Problem: AI responses don't relate to uploaded documents
-🔧 Solutions:
-1. Verify document was properly imported (check Context panel)
-2. Ensure "Study Materials Only" mode is selected
-3. Check if context was accidentally cleared
-4. Re-upload document and try again
-5. Ask more specific questions about document content
-
-❌ Problem: Generation seems stuck or very slow
-🔧 Solutions:
-1. Click the Stop button (⏹ STOP) or press Escape
-2. Wait a moment and try again
-3. Reduce max output tokens
-4. Check system resources (CPU/Memory usage)
-5. Restart application if problem persists
-
-═══════════════════════════════════════════════════════════════════════════════
-
-📄 DOCUMENT HANDLING ISSUES
-
-❌ Problem: PDF won't open in Document Viewer
-🔧 Solutions:
-1. Ensure file isn't password-protected
-2. Try a different PDF reader to verify file integrity
-3. Check file permissions
-4. Try converting to a different format
-5. Use text extraction software if needed
-
-❌ Problem: Text extraction is garbled or incorrect
-🔧 Solutions:
-1. Try using OCR software for scanned documents
-2. Copy-paste text manually if possible
-3. Convert document to plain text format
-4. Check document encoding (try UTF-8)
-5. Use alternative document format
-
-❌ Problem: Document Viewer crashes
-🔧 Solutions:
-1. Check file size (very large files may cause issues)
-2. Close other applications to free memory
-3. Try processing document in smaller sections
-4. Restart application and try again
-5. Use system document viewer as alternative
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔢 TOKEN MANAGEMENT ISSUES
-
-❌ Problem: Token count seems incorrect
-🔧 Solutions:
-1. Click "Refresh Tokens" button
-2. Clear and re-add context if needed
-3. Check for hidden characters or formatting
-4. Restart conversation if counts remain wrong
-5. Export and clear history, then restart
-
-❌ Problem: Reaching token limits too quickly
-🔧 Solutions:
-1. Reduce "Messages to include" in history
-2. Clear old chat history more frequently
-3. Use selective document imports (specific pages)
-4. Edit context to remove unnecessary content
-5. Use shorter, more focused inputs
-
-❌ Problem: Token warnings not appearing
-🔧 Solutions:
-1. Check if token display is visible
-2. Refresh token counts manually
-3. Restart application if display seems frozen
-4. Monitor usage manually with export feature
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🖼️ MULTIMEDIA ISSUES
-
-❌ Problem: Images not being detected from clipboard
-🔧 Solutions:
-1. Try copying image again
-2. Check if image format is supported
-3. Restart clipboard monitoring (restart app)
-4. Use "Add Image" button as alternative
-5. Check system clipboard permissions
-
-❌ Problem: Screen capture not working
-🔧 Solutions:
-1. Check screen capture permissions (macOS/Linux)
-2. Try alternative: use system screenshot tool + clipboard
-3. Ensure no other screen capture software is interfering
-4. Restart application and try again
-5. Use "Add Image" to manually select screenshots
-
-❌ Problem: Audio recording fails
-🔧 Solutions:
-1. Check microphone permissions
-2. Verify audio device is connected and working
-3. Test with system audio recorder first
-4. Check if other applications are using microphone
-5. Restart application and try again
-
-❌ Problem: Audio file import fails
-🔧 Solutions:
-1. Check if audio format is supported (MP3, WAV, M4A, AAC, OGG, FLAC, WMA)
-2. Verify file is not corrupted (test in media player)
-3. Check file permissions and accessibility
-4. Try converting to MP3 or WAV format
-5. Ensure file size is reasonable (under 100MB recommended)
-
-❌ Problem: Audio duration detection incorrect
-🔧 Solutions:
-1. Check if file format is fully supported
-2. File may be corrupted - test in audio player
-3. Application will use file size estimation as fallback
-4. Convert to standard format (MP3/WAV) for better detection
-5. Manual token estimation: ~6.25 tokens per second
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🎓 EDUCATIONAL TOOL ISSUES
-
-❌ Problem: Educational tools generate generic responses
-🔧 Solutions:
-1. Upload more specific study materials
-2. Enable "General Subject Settings" if no materials uploaded
-3. Set appropriate grade level and difficulty
-4. Be more specific in your study focus
-5. Try different educational tools for variety
-
-❌ Problem: Quiz questions don't match study materials
-🔧 Solutions:
-1. Verify study materials are loaded in Context panel
-2. Ensure "Study Materials Only" mode is active
-3. Check that uploaded materials contain relevant content
-4. Try regenerating quiz with different parameters
-5. Use more focused document sections
-
-❌ Problem: Assessment tools seem too easy/hard
-🔧 Solutions:
-1. Adjust difficulty setting in Study Settings
-2. Change grade level to match your needs
-3. Upload more appropriate study materials
-4. Use skill evaluation to determine proper level
-5. Customize quiz parameters manually
-
-═══════════════════════════════════════════════════════════════════════════════
-
-💻 PERFORMANCE ISSUES
-
-❌ Problem: Application running slowly
-🔧 Solutions:
-1. Close unnecessary applications to free memory
-2. Reduce max output tokens
-3. Clear chat history more frequently
-4. Limit number of attachments
-5. Restart application periodically
-
-❌ Problem: Interface becomes unresponsive
-🔧 Solutions:
-1. Wait for current operation to complete
-2. Use Stop button if AI is generating
-3. Try clicking in different interface areas
-4. Restart application if completely frozen
-5. Check system resource usage
-
-❌ Problem: High memory usage
-🔧 Solutions:
-1. Clear chat history regularly
-2. Remove large attachments
-3. Restart application to clear memory
-4. Close unused document viewers
-5. Monitor token usage to prevent overload
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔄 DATA MANAGEMENT ISSUES
-
-❌ Problem: Lost chat history
-🔧 Prevention:
-1. Export important conversations regularly
-2. Save context before clearing
-3. Use "Chat History" viewer to backup data
-4. Don't rely on application memory for long-term storage
-
-❌ Problem: Context disappeared
-🔧 Solutions:
-1. Check if accidentally cleared
-2. Re-upload documents if needed
-3. Load saved context files
-4. Verify Context panel is visible
-5. Check if switched study modes
-
-❌ Problem: Can't export chat history
-🔧 Solutions:
-1. Try different file formats (JSON vs TXT)
-2. Choose different save location
-3. Check file permissions in target directory
-4. Close other applications that might lock files
-5. Save in smaller sections if large
-
-═══════════════════════════════════════════════════════════════════════════════
-
-⚙️ SYSTEM COMPATIBILITY
-
-🖥️ Operating System Issues:
-• Windows: Ensure Windows 10+ for best compatibility
-• macOS: Requires macOS 10.14+ and appropriate permissions
-• Linux: Most distributions supported, may need additional packages
-
-🔧 Hardware Requirements:
-• RAM: 8GB minimum, 16GB recommended
-• Storage: 5GB free space for models and cache
-• CPU: Modern multi-core processor recommended
-• GPU: Optional but improves performance significantly
-
-📱 Resolution and Display:
-• Minimum: 1024x768 resolution
-• Recommended: 1920x1080 or higher
-• Multiple monitors: Supported
-• High DPI: May require system scaling adjustments
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🆘 GETTING ADDITIONAL HELP
-
-📞 When to Seek Help:
-• Persistent crashes or errors
-• Model fails to load repeatedly
-• Data corruption or loss
-• Performance severely degraded
-• Features completely non-functional
-
-📋 Information to Provide:
-• Operating system and version
-• Error messages (exact text)
-• Steps to reproduce the problem
-• System specifications
-• Recent changes to system or software
-
-💡 Self-Help Resources:
-• Check console/terminal for detailed error messages
-• Review system requirements
-• Update system and drivers
-• Try running with administrator/sudo privileges
-• Test with minimal configurations
-
-═══════════════════════════════════════════════════════════════════════════════
-
-🔒 PRIVACY AND SECURITY
-
-🛡️ Data Handling:
-• All processing happens locally on your device
-• No data sent to external servers (except initial model download)
-• Temporary files cleaned up on exit
-• Chat history stored locally only
-
-🔐 File Security:
-• Uploaded documents processed locally
-• Temporary files use system security
-• No persistent storage of sensitive content
-• User controls all data retention
-
-Remember: Most issues can be resolved by restarting the application or clearing temporary data. When in doubt, try the simplest solution first!
-        """
-        
-        text_widget.insert(1.0, content)
-        text_widget.config(state=tk.DISABLED)
-
-class ChatHistoryViewer:
-    def __init__(self, parent, chat_history, token_manager):
-        self.parent = parent
-        self.chat_history = chat_history
-        self.token_manager = token_manager
-        self.setup_viewer()
-        self.update_display()
-        
-    def setup_viewer(self):
-        self.window = tk.Toplevel(self.parent)
-        self.window.title("Chat History & Token Usage")
-        self.window.geometry("700x600")
-        self.window.resizable(True, True)
-        self.window.minsize(500, 400)
-        
-        toolbar = ttk.Frame(self.window)
-        toolbar.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(toolbar, text="Clear History", command=self.clear_history).pack(side=tk.LEFT, padx=5)
-        ttk.Button(toolbar, text="Export History", command=self.export_history).pack(side=tk.LEFT, padx=5)
-        ttk.Button(toolbar, text="Refresh", command=self.update_display).pack(side=tk.LEFT, padx=5)
-        
-        self.tree = ttk.Treeview(self.window, columns=('Role', 'Tokens', 'Content'), show='tree headings')
-        self.tree.heading('#0', text='#')
-        self.tree.heading('Role', text='Role')
-        self.tree.heading('Tokens', text='Tokens')
-        self.tree.heading('Content', text='Content Preview')
-        
-        self.tree.column('#0', width=50)
-        self.tree.column('Role', width=80)
-        self.tree.column('Tokens', width=80)
-        self.tree.column('Content', width=400)
-        
-        scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
         
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -2619,34 +1614,77 @@ class ChatHistoryViewer:
         self.window.columnconfigure(0, weight=1)
         self.window.rowconfigure(1, weight=1)
         
+    def toggle_show_all(self):
+        self.reset_rows()
+        self.update_display()
+        
+    def reset_rows(self):
+        self.tree.delete(*self.tree.get_children())
+        self.rendered_rows = {}
+        self.rendered_count = 0
+        self.first_rendered = 0
+        self.last_entry_tokens = 0
+        self.total_tokens = 0
+        
     def update_display(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        total_tokens = 0
-        for i, entry in enumerate(self.chat_history):
+        # Only the newest rows are shown unless "Show all" is ticked
+        first = 0 if self.show_all_var.get() else max(0, len(self.chat_history) - HISTORY_VIEW_LIMIT)
+        
+        # Rows are only appended for entries added since the last refresh; a history
+        # that was cleared or replaced in the meantime is rebuilt from scratch
+        if self.rendered_count and (len(self.chat_history) < self.rendered_count
+                                    or self.chat_history[self.rendered_count - 1] is not self.last_rendered_entry
+                                    or first < self.first_rendered):
+            self.reset_rows()
+            
+        # The newest entry can still receive its final token count after being shown
+        start = max(0, self.rendered_count - 1)
+        self.total_tokens -= self.last_entry_tokens
+        
+        # Count any entries without a stored total in one batched call and keep the
+        # result on the entry so later refreshes don't tokenize them again
+        uncounted = [i for i in range(start, len(self.chat_history))
+                     if isinstance(self.chat_history[i], dict) and 'role' in self.chat_history[i]
+                     and 'tokens' not in self.chat_history[i]]
+        counts = self.token_manager.count_text_tokens_batch(
+            [str(self.chat_history[i].get('content', '')) for i in uncounted])
+        for i, tokens in zip(uncounted, counts):
+            self.chat_history[i]['tokens'] = tokens
+            
+        for i in [i for i in self.rendered_rows if i < first]:
+            self.tree.delete(self.rendered_rows.pop(i))
+            
+        self.last_entry_tokens = 0
+        for i in range(start, len(self.chat_history)):
+            entry = self.chat_history[i]
             if isinstance(entry, dict) and 'role' in entry:
                 role = entry['role']
                 content = str(entry.get('content', ''))
                 
-                tokens = 0
-                if 'tokens' in entry:
-                    tokens = entry['tokens']
-                else:
-                    tokens = self.token_manager.count_text_tokens(content)
-                
+                tokens = entry['tokens']
+                self.total_tokens += tokens
+                if i == len(self.chat_history) - 1:
+                    self.last_entry_tokens = tokens
+                if i < first:
+                    continue
+                    
                 preview = content[:60] + "..." if len(content) > 60 else content
                 preview = preview.replace('\n', ' ')
                 
-                total_tokens += tokens
-                
-                self.tree.insert('', tk.END, text=str(i+1), values=(role, tokens, preview))
+                if i in self.rendered_rows:
+                    self.tree.item(self.rendered_rows[i], values=(role, tokens, preview))
+                else:
+                    self.rendered_rows[i] = self.tree.insert('', tk.END, text=str(i+1), values=(role, tokens, preview))
+        self.rendered_count = len(self.chat_history)
+        self.first_rendered = first
+        self.last_rendered_entry = self.chat_history[-1] if self.chat_history else None
+        total_tokens = self.total_tokens
         
         usage_percent = (total_tokens / self.token_manager.max_context_tokens) * 100
         color = self.token_manager.get_color_for_usage(total_tokens)
         
         self.summary_label.config(
-            text=f"Total History: {total_tokens:,} tokens ({usage_percent:.1f}% of 32K limit)",
+            text=f"Total History: {total_tokens:,} tokens ({usage_percent:.1f}% of {self.token_manager.max_context_tokens:,} limit)",
             foreground=color
         )
         
@@ -2662,36 +1700,47 @@ class ChatHistoryViewer:
             filetypes=[("JSON files", "*.json"), ("Text files", "*.txt")]
         )
         if file_path:
-            try:
-                if file_path.endswith('.json'):
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        json.dump(self.chat_history, f, indent=2, ensure_ascii=False)
-                else:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        for entry in self.chat_history:
-                            f.write(f"{entry.get('role', 'unknown').upper()}: {entry.get('content', '')}\n\n")
-                messagebox.showinfo("Export Complete", f"History exported to {os.path.basename(file_path)}")
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Could not export history: {str(e)}")
+            # Serialize a snapshot off the Tk thread; long histories take a moment
+            self.window.config(cursor='watch')
+            future = IO_POOL.submit(self.write_history_export, file_path, list(self.chat_history))
+            future.add_done_callback(lambda f: self.window.after(0, self.export_complete, file_path, f.exception()))
+            
+    def write_history_export(self, file_path, history):
+        if file_path.endswith('.json'):
+            if orjson:
+                with open(file_path, 'wb') as f:
+                    f.write(orjson.dumps(history, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(history, f, indent=2, ensure_ascii=False)
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write("".join(f"{entry.get('role', 'unknown').upper()}: {entry.get('content', '')}\n\n" for entry in history))
+                
+    def export_complete(self, file_path, error):
+        self.window.config(cursor='')
+        if error:
+            messagebox.showerror("Export Error", f"Could not export history: {str(error)}")
+        else:
+            messagebox.showinfo("Export Complete", f"History exported to {os.path.basename(file_path)}")
 
 class ScreenCapture:
     def __init__(self, callback):
         self.callback = callback
-        self.screenshot = ImageGrab.grab()
         
+        # Draw the selection on a dimmed see-through overlay and only grab the chosen
+        # region afterwards, instead of snapshotting and redisplaying the whole screen
         self.root = tk.Toplevel()
         self.root.attributes('-fullscreen', True)
         self.root.attributes('-topmost', True)
+        self.root.attributes('-alpha', 0.3)
         self.root.bind('<Button-1>', self.on_click)
         self.root.bind('<B1-Motion>', self.on_drag)
         self.root.bind('<ButtonRelease-1>', self.on_release)
         self.root.bind('<Escape>', lambda e: self.root.destroy())
 
-        self.tk_image = ImageTk.PhotoImage(self.screenshot)
-
-        self.canvas = tk.Canvas(self.root, cursor='cross')
+        self.canvas = tk.Canvas(self.root, cursor='cross', bg='black', highlightthickness=0)
         self.canvas.pack(fill='both', expand=True)
-        self.canvas.create_image(0, 0, anchor='nw', image=self.tk_image)
 
         self.start_x = self.start_y = None
         self.rect = None
@@ -2711,38 +1760,132 @@ class ScreenCapture:
             )
 
     def on_release(self, event):
-        x1, y1 = min(self.start_x, event.x), min(self.start_y, event.y)
-        x2, y2 = max(self.start_x, event.x), max(self.start_y, event.y)
-        cropped_img = self.screenshot.crop((x1, y1, x2, y2))
+        offset_x, offset_y = self.root.winfo_rootx(), self.root.winfo_rooty()
+        x1, y1 = min(self.start_x, event.x) + offset_x, min(self.start_y, event.y) + offset_y
+        x2, y2 = max(self.start_x, event.x) + offset_x, max(self.start_y, event.y) + offset_y
+        
+        # Let the overlay disappear from the screen before grabbing underneath it
+        self.root.withdraw()
+        self.root.after(100, lambda: self.grab_region((x1, y1, max(x2, x1 + 1), max(y2, y1 + 1))))
+        
+    def grab_region(self, bbox):
         self.root.destroy()
-        self.callback(cropped_img)
+        self.callback(ImageGrab.grab(bbox=bbox))
+
+def get_generation_kwargs(tokenizer):
+    # Sampling settings and special token ids only depend on the loaded model, so
+    # they are worked out once per load rather than on every turn
+    actual_tokenizer = tokenizer.tokenizer if hasattr(tokenizer, 'tokenizer') else tokenizer
+    pad_token_id = getattr(actual_tokenizer, 'pad_token_id', None)
+    return dict(
+        temperature=0.7,
+        top_p=0.95,
+        top_k=64,
+        do_sample=True,
+        pad_token_id=pad_token_id if pad_token_id is not None else actual_tokenizer.eos_token_id,
+        eos_token_id=actual_tokenizer.eos_token_id,
+        use_cache=True,
+        return_dict_in_generate=True,
+    )
+
+class NotifyingQueue(queue.Queue):
+    # Calls on_put after every item so the consumer can be woken instead of polling
+    def __init__(self, on_put):
+        super().__init__()
+        self.on_put = on_put
+        
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        self.on_put()
 
 class ModelThread(threading.Thread):
-    def __init__(self, model, tokenizer, messages, response_queue, max_tokens=512):
+    generations_since_cleanup = 0
+
+    def __init__(self, model, tokenizer, messages, response_queue, max_tokens=512, prompt_cache=None, kv_cache=None,
+                 generation_kwargs=None):
         super().__init__()
         self.model = model
         self.tokenizer = tokenizer
         self.messages = messages
         self.response_queue = response_queue
         self.max_tokens = max_tokens
+        self.prompt_cache = prompt_cache
+        self.kv_cache = kv_cache
+        self.generation_kwargs = generation_kwargs
         self.daemon = True
         self.stop_generation = threading.Event()
         
     def stop(self):
         self.stop_generation.set()
         
+    def encode_turns(self, tokenizer, turns, torch):
+        # Every turn starts with a special token, so turns tokenize independently and
+        # earlier ones can be reused instead of re-encoding the whole history each time
+        pieces = []
+        for turn in turns:
+            ids = self.prompt_cache.get(turn) if self.prompt_cache is not None else None
+            if ids is None:
+                ids = tokenizer(turn, return_tensors="pt", add_special_tokens=False, padding=False)['input_ids']
+                if self.prompt_cache is not None:
+                    self.prompt_cache[turn] = ids
+                    if len(self.prompt_cache) > PROMPT_CACHE_SIZE:
+                        self.prompt_cache.popitem(last=False)
+            else:
+                self.prompt_cache.move_to_end(turn)
+            pieces.append(ids)
+        return torch.cat(pieces, dim=1)
+        
+    def get_reusable_kv_cache(self, input_ids):
+        # The previous turn's cache covers its prompt plus reply; keep the part that
+        # matches the start of this prompt so only the new tokens are prefilled
+        if not self.kv_cache or self.kv_cache.get('past') is None:
+            return None
+        past = self.kv_cache.pop('past')
+        cached_ids = self.kv_cache.pop('ids')
+        if not hasattr(past, 'crop') or cached_ids.device != input_ids.device:
+            return None
+        length = min(cached_ids.shape[1], input_ids.shape[1] - 1, past.get_seq_length())
+        mismatches = (cached_ids[0, :length] != input_ids[0, :length]).nonzero()
+        if len(mismatches):
+            length = int(mismatches[0])
+        if length == 0:
+            return None
+        past.crop(length)
+        return past
+        
+    def release_memory(self, torch):
+        # The caching allocator reuses freed blocks for the next turn, so emptying it
+        # after every generation only adds a sync and slows the next first token
+        ModelThread.generations_since_cleanup += 1
+        low_memory = False
+        if torch.cuda.is_available():
+            try:
+                free, total = torch.cuda.mem_get_info()
+                low_memory = free / total < CUDA_CLEANUP_FREE_RATIO
+            except Exception:
+                pass
+        if ModelThread.generations_since_cleanup >= CUDA_CLEANUP_INTERVAL or low_memory:
+            ModelThread.generations_since_cleanup = 0
+            torch.cuda.empty_cache()
+            gc.collect()
+
     def run(self):
+        torch = import_torch()
+        from transformers import TextStreamer
+        
         class StreamCapture(TextStreamer):
             def __init__(self, tokenizer, queue, stop_event):
                 super().__init__(tokenizer, skip_prompt=True)
                 self.queue = queue
                 self.stop_event = stop_event
+                self.streamed = False
                 
             def on_finalized_text(self, text, stream_end=False):
                 if self.stop_event.is_set():
                     return
                 cleaned_text = text.replace('<end_of_turn>', '').replace('<|end_of_text|>', '').replace('<|endoftext|>', '').replace('<start_of_turn>', '')
                 if cleaned_text:
+                    self.streamed = True
                     self.queue.put(('chunk', cleaned_text))
                     
             def put(self, value):
@@ -2758,7 +1901,7 @@ class ModelThread(threading.Thread):
                 self.response_queue.put(('error', "Model or tokenizer not loaded"))
                 return
             
-            conversation_text = ""
+            turns = []
             for msg in self.messages:
                 if self.stop_generation.is_set():
                     return
@@ -2782,11 +1925,12 @@ class ModelThread(threading.Thread):
                     
                 if content.strip():
                     if role == 'user':
-                        conversation_text += f"<start_of_turn>user\n{content}<end_of_turn>\n"
+                        turns.append(USER_TURN_PREFIX + content + TURN_SUFFIX)
                     else:
-                        conversation_text += f"<start_of_turn>model\n{content}<end_of_turn>\n"
+                        turns.append(MODEL_TURN_PREFIX + content + TURN_SUFFIX)
             
-            conversation_text += "<start_of_turn>model\n"
+            turns.append(MODEL_TURN_PREFIX)
+            conversation_text = "".join(turns)
             
             if not conversation_text.strip() or self.stop_generation.is_set():
                 if not self.stop_generation.is_set():
@@ -2801,9 +1945,8 @@ class ModelThread(threading.Thread):
                 else:
                     actual_tokenizer = self.tokenizer
                 
-                encoding = actual_tokenizer(conversation_text, return_tensors="pt", add_special_tokens=False, padding=False)
-                input_ids = encoding['input_ids']
-                attention_mask = encoding.get('attention_mask', torch.ones_like(input_ids))
+                input_ids = self.encode_turns(actual_tokenizer, turns, torch)
+                attention_mask = torch.ones_like(input_ids)
                 
                 if input_ids is None or self.stop_generation.is_set():
                     if not self.stop_generation.is_set():
@@ -2813,8 +1956,10 @@ class ModelThread(threading.Thread):
                 print(f"Manual tokenization successful, shape: {input_ids.shape}")
                 
                 if torch.cuda.is_available():
-                    input_ids = input_ids.to("cuda")
-                    attention_mask = attention_mask.to("cuda")
+                    # Copy from pinned memory so the transfer doesn't stall the host; work on
+                    # the same stream stays ordered after it
+                    input_ids = input_ids.pin_memory().to("cuda", non_blocking=True)
+                    attention_mask = attention_mask.pin_memory().to("cuda", non_blocking=True)
                 
                 with torch.no_grad():
                     if self.stop_generation.is_set():
@@ -2822,18 +1967,36 @@ class ModelThread(threading.Thread):
                         
                     streamer = StreamCapture(actual_tokenizer, self.response_queue, self.stop_generation)
                     
-                    outputs = self.model.generate(
+                    generate_kwargs = dict(
                         input_ids=input_ids,
                         attention_mask=attention_mask,
                         max_new_tokens=self.max_tokens,
-                        temperature=0.7,
-                        top_p=0.95,
-                        top_k=64,
-                        do_sample=True,
-                        pad_token_id=actual_tokenizer.pad_token_id if hasattr(actual_tokenizer, 'pad_token_id') and actual_tokenizer.pad_token_id is not None else actual_tokenizer.eos_token_id,
-                        eos_token_id=actual_tokenizer.eos_token_id,
-                        streamer=streamer
+                        streamer=streamer,
+                        **(self.generation_kwargs or get_generation_kwargs(self.tokenizer)),
                     )
+                    
+                    past = self.get_reusable_kv_cache(input_ids)
+                    if past is not None:
+                        try:
+                            outputs = self.model.generate(past_key_values=past, **generate_kwargs)
+                        except Exception as cache_error:
+                            print(f"Could not reuse KV cache: {cache_error}")
+                            if streamer.streamed:
+                                # Part of the reply is already shown; a retry would repeat it
+                                self.response_queue.put(('error', f"Generation failed: {cache_error}"))
+                                self.release_memory(torch)
+                                return
+                            # Not every cache layout can be resumed; prefill from scratch with a
+                            # new streamer, since the old one has already consumed the prompt
+                            streamer = StreamCapture(actual_tokenizer, self.response_queue, self.stop_generation)
+                            generate_kwargs['streamer'] = streamer
+                            past = None
+                    if past is None:
+                        outputs = self.model.generate(**generate_kwargs)
+                        
+                    if self.kv_cache is not None and outputs.past_key_values is not None:
+                        self.kv_cache['ids'] = outputs.sequences
+                        self.kv_cache['past'] = outputs.past_key_values
                 
                 print(f"Generation completed successfully")
                 
@@ -2843,12 +2006,9 @@ class ModelThread(threading.Thread):
                 print(f"Manual tokenization error: {manual_error}")
                 
                 try:
-                    simple_text = ""
-                    for msg in self.messages:
-                        role = msg.get('role', 'user').capitalize()
-                        content = str(msg.get('content', ''))
-                        simple_text += f"{role}: {content}\n"
-                    simple_text += "Assistant:"
+                    simple_text = "".join(
+                        f"{msg.get('role', 'user').capitalize()}: {msg.get('content', '')}\n" for msg in self.messages
+                    ) + "Assistant:"
                     
                     if hasattr(self.tokenizer, 'tokenizer'):
                         encoding = self.tokenizer.tokenizer(simple_text, return_tensors="pt", padding=False)
@@ -2892,8 +2052,7 @@ class ModelThread(threading.Thread):
                 del attention_mask
             if 'outputs' in locals():
                 del outputs
-            torch.cuda.empty_cache()
-            gc.collect()
+            self.release_memory(torch)
             
             if not self.stop_generation.is_set():
                 self.response_queue.put(('complete', None))
@@ -2906,6 +2065,223 @@ class ModelThread(threading.Thread):
                 print(f"ModelThread error: {error_msg}")
                 self.response_queue.put(('error', error_msg))
 
+# Prompt templates for the educational tools, filled in with str.format
+EXPLAIN_CONCEPT_STEPS = (
+    "2. Provide clear, simple definitions\n"
+    "3. Give real-world examples\n"
+    "4. Break down complex parts step-by-step\n"
+    "5. Include common misconceptions to avoid\n"
+    "6. Suggest ways to remember these concepts\n"
+)
+EXPLAIN_CONCEPT_GENERAL_PROMPT = (
+    "Explain key concepts in {subject} for {grade} level at {difficulty} difficulty. Please:\n"
+    "1. Identify important concepts in this subject area\n"
+    + EXPLAIN_CONCEPT_STEPS +
+    "7. Provide practice questions\n\n"
+    "{context_note}"
+)
+EXPLAIN_CONCEPT_MATERIALS_PROMPT = (
+    "Based on the uploaded study materials and our conversation, explain the key concepts covered. Please:\n"
+    "1. Identify the main concepts from the materials\n"
+    + EXPLAIN_CONCEPT_STEPS +
+    "7. Provide practice questions based on the material"
+)
+
+CONCEPT_MAP_BRANCHES = (
+    "├── Core Subtopic 1\n│   ├── Key Detail A\n│   ├── Key Detail B\n│   └── connects to → [Related Concept]\n"
+    "├── Core Subtopic 2\n│   ├── Important Point X\n│   └── Important Point Y\n"
+    "└── Core Subtopic 3\n    └── leads to → [Next Level Topic]\n\n"
+)
+CONCEPT_MAP_GENERAL_PROMPT = (
+    "Create a comprehensive concept map for key topics in {subject}. Structure it as:\n\n"
+    "MAIN CONCEPT: [Core subject concept]\n"
+    + CONCEPT_MAP_BRANCHES +
+    "Include:\n1. Main concept at center\n"
+    "2. 3-5 major subtopics\n3. Key details under each subtopic\n"
+    "4. Clear relationships between concepts\n5. Real-world examples where relevant\n"
+    "6. Prerequisites and follow-up topics\n\n"
+    "{context_note}"
+)
+CONCEPT_MAP_MATERIALS_PROMPT = (
+    "Create a comprehensive concept map based on the uploaded study materials and our conversation. Structure it as:\n\n"
+    "MAIN CONCEPT: [Identify from materials]\n"
+    + CONCEPT_MAP_BRANCHES +
+    "Base the concept map entirely on the uploaded study materials and our conversation."
+)
+
+HOMEWORK_HINT_STEPS = (
+    "1. Guiding questions to help think through problems\n"
+    "2. Relevant concepts to review\n3. Similar example problems\n"
+    "4. Step-by-step approach without giving away answers\n"
+    "5. Common mistakes to avoid\n\n"
+)
+HOMEWORK_HINTS_GENERAL_PROMPT = (
+    "Provide homework hints for common {subject} problems by giving HINTS, not direct answers:\n\n"
+    "For typical {subject} homework problems and concepts:\n\n"
+    "{context_note}"
+    "For each topic/problem type, provide:\n"
+    + HOMEWORK_HINT_STEPS +
+    "Focus on helping learn and understand the process, not just getting answers."
+)
+HOMEWORK_HINTS_MATERIALS_PROMPT = (
+    "Based on the uploaded study materials and our conversation, provide homework hints by giving HINTS, not direct answers:\n\n"
+    "Look at the study materials and our discussion to identify potential homework problems or concepts that need practice.\n\n"
+    "For each identified topic/problem type, provide:\n"
+    + HOMEWORK_HINT_STEPS +
+    "Focus on helping learn and understand the process from the materials."
+)
+
+STEP_BY_STEP_STEPS = (
+    "For each problem type, break it down into clear steps:\n"
+    "Step 1: [What to do and why]\nStep 2: [Next action and reasoning]\nStep 3: [Continue...]\n\n"
+    "For each step, explain:\n- What to do\n- Why we do it\n"
+    "- What to look out for\n- How it connects to the next step\n\n"
+    "Include the reasoning behind each step to promote understanding and provide multiple examples."
+)
+STEP_BY_STEP_GENERAL_PROMPT = (
+    "Provide step-by-step guidance for common {subject} problems:\n\n"
+    "{context_note}"
+    + STEP_BY_STEP_STEPS
+)
+STEP_BY_STEP_MATERIALS_PROMPT = (
+    "Provide step-by-step guidance based on the uploaded study materials and our conversation:\n\n"
+    "Based on the study materials, identify key problem types and provide detailed step-by-step solutions.\n\n"
+    + STEP_BY_STEP_STEPS
+)
+
+SIMILAR_PROBLEMS_STEPS = (
+    "For each similar problem:\n1. State the problem clearly\n"
+    "2. Vary the numbers/context while keeping the same concept\n"
+    "3. Include the solution approach\n4. Indicate the difficulty level\n"
+    "5. Note what concept it reinforces\n\n"
+    "Arrange them from easier to harder to build confidence and cover different variations of the same concept types."
+)
+SIMILAR_PROBLEMS_GENERAL_PROMPT = (
+    "Create 3-5 similar practice problems for {subject} at {difficulty} level:\n\n"
+    "{context_note}"
+    + SIMILAR_PROBLEMS_STEPS
+)
+SIMILAR_PROBLEMS_MATERIALS_PROMPT = (
+    "Based on the uploaded study materials and our conversation, create 3-5 similar practice problems:\n\n"
+    "Use the study materials to identify key problem types, then create similar practice problems.\n\n"
+    + SIMILAR_PROBLEMS_STEPS
+)
+
+QUIZ_STEPS = (
+    "For each question:\n1. Create a clear, well-written question\n"
+    "2. Provide multiple choice options (A, B, C, D) if applicable\n"
+    "3. Indicate the correct answer\n4. Explain why the correct answer is right\n"
+    "5. Explain why wrong answers are incorrect\n6. Include difficulty level for each question\n\n"
+    "Make questions progressively challenging and cover different aspects of the material."
+)
+QUIZ_GENERAL_PROMPT = (
+    "Create a {num_questions}-question {quiz_type} quiz for {subject} at {difficulty} level"
+    "{context_note}"
+    + QUIZ_STEPS
+)
+QUIZ_MATERIALS_PROMPT = (
+    "Create a {num_questions}-question {quiz_type} quiz based entirely on the uploaded study materials and our conversation.\n\n"
+    + QUIZ_STEPS
+)
+
+ADAPTIVE_PRACTICE_STEPS = (
+    "Please:\n1. Start with easier questions to build confidence\n"
+    "2. Gradually increase difficulty based on the material\n"
+    "3. Focus on key concepts that need practice\n"
+    "4. Provide immediate feedback after each question\n"
+    "5. Create questions that build on each other\n\n"
+    "Begin with 3 warm-up questions, then progressively challenge with more complex problems."
+)
+ADAPTIVE_PRACTICE_GENERAL_PROMPT = (
+    "Create an adaptive practice session for {subject} at {difficulty} level. "
+    "{context_note}"
+    + ADAPTIVE_PRACTICE_STEPS
+)
+ADAPTIVE_PRACTICE_MATERIALS_PROMPT = (
+    "Create an adaptive practice session based entirely on the uploaded study materials and our conversation. "
+    + ADAPTIVE_PRACTICE_STEPS
+)
+
+PRACTICE_TEST_STRUCTURE = (
+    "Test Structure:\n1. Mix of question types (multiple choice, short answer, essay)\n"
+    "2. Cover all major topics from the material\n"
+    "3. Include easy, medium, and hard questions\n4. Provide detailed answer key\n"
+    "5. Include point values and time suggestions\n6. Add study tips for difficult concepts\n\n"
+    "Format as a real exam with clear instructions. Make it 10-15 questions covering the breadth of topics."
+)
+PRACTICE_TEST_GENERAL_PROMPT = (
+    "Create a comprehensive practice test for {subject} at {difficulty} level"
+    "{context_note}"
+    + PRACTICE_TEST_STRUCTURE
+)
+PRACTICE_TEST_MATERIALS_PROMPT = (
+    "Create a comprehensive practice test based entirely on the uploaded study materials and our conversation.\n\n"
+    + PRACTICE_TEST_STRUCTURE
+)
+
+TIMED_ASSESSMENT_DESIGN = (
+    "ASSESSMENT DESIGN:\n"
+    "1. QUESTIONS (for 20 minutes):\n"
+    "   - 60% quick recall/recognition (1-2 min each)\n"
+    "   - 30% problem-solving (3-5 min each)\n"
+    "   - 10% analysis/synthesis (5-7 min each)\n\n"
+    "2. TIME MANAGEMENT GUIDE:\n"
+    "   - Suggest time allocation per section\n"
+    "   - Include pacing strategies\n"
+    "   - Mark point values clearly\n\n"
+    "3. INSTRUCTIONS:\n"
+    "   - Clear format and expectations\n"
+    "   - Tips for managing time pressure\n"
+    "   - Scoring rubric\n\n"
+    "Base questions on the relevant topics and concepts."
+)
+TIMED_ASSESSMENT_GENERAL_PROMPT = (
+    "Create a 20-minute timed assessment for {subject} at {difficulty} level"
+    "{context_note}"
+    + TIMED_ASSESSMENT_DESIGN
+)
+TIMED_ASSESSMENT_MATERIALS_PROMPT = (
+    "Create a 20-minute timed assessment based entirely on the uploaded study materials and our conversation.\n\n"
+    + TIMED_ASSESSMENT_DESIGN
+)
+
+SKILL_ASSESSMENT_FRAMEWORK = (
+    "ASSESSMENT FRAMEWORK:\n"
+    "1. FOUNDATIONAL KNOWLEDGE (25%)\n   - Basic concepts and terminology\n   - Essential facts and principles\n\n"
+    "2. APPLICATION SKILLS (25%)\n   - Using knowledge to solve problems\n   - Applying concepts to new situations\n\n"
+    "3. ANALYTICAL THINKING (25%)\n   - Breaking down complex problems\n   - Identifying patterns and relationships\n\n"
+    "4. SYNTHESIS & EVALUATION (25%)\n   - Combining ideas creatively\n   - Making judgments and assessments\n\n"
+    "For each area, provide:\n- 2-3 diagnostic questions\n"
+    "- Performance indicators (Beginner/Intermediate/Advanced)\n"
+    "- Specific feedback based on responses\n- Targeted improvement recommendations\n"
+    "- Next steps for skill development"
+)
+SKILL_ASSESSMENT_GENERAL_PROMPT = (
+    "Create a comprehensive skill assessment for {subject} at {grade} level"
+    "{context_note}"
+    + SKILL_ASSESSMENT_FRAMEWORK
+)
+SKILL_ASSESSMENT_MATERIALS_PROMPT = (
+    "Create a comprehensive skill assessment based entirely on the uploaded study materials and our conversation.\n\n"
+    + SKILL_ASSESSMENT_FRAMEWORK
+)
+
+IMPROVEMENT_SUGGESTIONS_STEPS = (
+    "1. Areas that might need more focus\n2. Study techniques that could help\n"
+    "3. Ways to deepen understanding\n4. Next topics to explore\n"
+    "5. Methods to retain information better\n6. Specific practice exercises\n"
+    "7. Resources for further learning"
+)
+
+STRENGTHS_ANALYSIS_STEPS = (
+    " and any patterns you can observe, please analyze:\n"
+    "1. Learning style preferences I'm showing\n2. Areas where I seem most engaged\n"
+    "3. Types of questions I ask most\n4. Problem-solving approaches I prefer\n"
+    "5. Consistent patterns in my learning\n6. Strengths to build upon\n"
+    "7. Natural talents or inclinations you've noticed"
+)
+
+
 class ChatbotApp:
     def __init__(self, root):
         self.root = root
@@ -2914,7 +2290,6 @@ class ChatbotApp:
         self.root.geometry("1600x900")
         
         self.root.resizable(True, True)
-        self.root.wm_resizable(True, True)
         
         try:
             self.root.wm_attributes('-type', 'normal')
@@ -2925,15 +2300,47 @@ class ChatbotApp:
         self.model_manager = ModelManager()
         
         self.attachments = []
-        self.chat_context = ""
         self.context_pages = []
         self.chat_history = []
         self.history_messages_var = tk.StringVar(value="10")
         self.recording = False
-        self.audio_data = []
-        self.response_queue = queue.Queue()
+        self.audio_path = None
+        self.audio_stream = None
+        self.audio_blocks = None
+        self.audio_writer = None
+        self.audio_frames = 0
+        self.response_queue = NotifyingQueue(self.wake_response_queue)
+        self.response_wakeup = threading.Event()
+        self.status_wakeup = threading.Event()
+        self.pending_status = None
+        # Model loads run one after another on a single long-lived thread
+        self.loader_queue = queue.Queue()
+        self.loader_thread = None
         self.model_loaded = False
         self.max_output_tokens = 512
+        self.input_token_state = ("", 0)
+        self.input_token_job = None
+        self.context_token_job = None
+        self.context_token_future = None
+        # Stripped widget text for the token display, kept until Tk reports the widget
+        # was modified; code that edits the widgets itself clears them right away
+        self.input_snapshot = None
+        self.context_snapshot = None
+        self.history_context_job = None
+        self.history_context_rows = []
+        self.history_context_tag_seq = 0
+        self.token_refresh_pending = False
+        self.token_display_state = None
+        # Token ids of recently sent conversation turns, shared with ModelThread
+        self.prompt_cache = collections.OrderedDict()
+        # Attention cache of the last generation, reused for the shared prompt prefix
+        self.kv_cache = {}
+        self.history_token_entries = []
+        self.history_token_totals = [0]
+        self.history_role_counts = {}
+        self.history_role_covered = 0
+        self.history_role_last = None
+        self.generation_kwargs = None
         self.current_generation_thread = None
         self.is_generating = False
         self.model = None
@@ -2944,7 +2351,7 @@ class ChatbotApp:
         
         self.setup_ui()
         self.setup_clipboard_monitor()
-        self.check_response_queue()
+        self.poll_background()
         
         self.root.bind('<Escape>', lambda e: self.stop_generation() if self.is_generating else None)
         self.root.bind('<F1>', lambda e: self.show_help())
@@ -2956,7 +2363,6 @@ class ChatbotApp:
     def ensure_resizable(self):
         try:
             self.root.resizable(True, True)
-            self.root.wm_resizable(True, True)
             
             try:
                 self.root.wm_attributes('-type', 'normal')
@@ -3039,6 +2445,7 @@ class ChatbotApp:
         self.input_text.bind('<Control-Return>', lambda e: self.send_message())
         self.input_text.bind('<Escape>', lambda e: self.stop_generation() if self.is_generating else None)
         self.input_text.bind('<KeyRelease>', self.update_input_tokens)
+        self.input_text.bind('<<Modified>>', self.on_input_modified)
         
         self.send_btn = ttk.Button(input_frame, text="Send\n(Ctrl+Enter)", command=self.send_message)
         self.send_btn.grid(row=0, column=3, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 0))
@@ -3105,6 +2512,7 @@ class ChatbotApp:
         )
         self.context_display.pack(fill=tk.BOTH, expand=True)
         self.context_display.bind('<KeyRelease>', self.update_context_tokens)
+        self.context_display.bind('<<Modified>>', self.on_context_modified)
         
         editable_controls = ttk.Frame(editable_frame)
         editable_controls.pack(fill=tk.X, pady=(5, 0))
@@ -3145,9 +2553,10 @@ class ChatbotApp:
         
         ttk.Label(history_controls, text="Messages to include:").pack(side=tk.LEFT, padx=(10, 5))
         self.history_messages_var = tk.StringVar(value="10")
-        history_spinbox = ttk.Spinbox(history_controls, from_=1, to=50, textvariable=self.history_messages_var, width=5)
+        history_spinbox = ttk.Spinbox(history_controls, from_=1, to=50, textvariable=self.history_messages_var, width=5,
+                                      command=self.schedule_history_context)
         history_spinbox.pack(side=tk.LEFT)
-        history_spinbox.bind('<KeyRelease>', lambda e: self.update_history_context())
+        history_spinbox.bind('<KeyRelease>', self.schedule_history_context)
         
         self.history_info_label = ttk.Label(history_controls, text="History: 0 tokens", foreground='gray')
         self.history_info_label.pack(side=tk.RIGHT)
@@ -3208,33 +2617,25 @@ class ChatbotApp:
         self.setup_learning_practice_tab()
         self.setup_assessment_tab()
         
-    def setup_learning_practice_tab(self):
-        learning_frame = ttk.Frame(self.edu_notebook)
-        self.edu_notebook.add(learning_frame, text="■ Learn & Practice")
-        
-        scrollable_frame = ttk.Frame(learning_frame)
-        canvas = tk.Canvas(scrollable_frame)
-        scrollbar = ttk.Scrollbar(scrollable_frame, orient="vertical", command=canvas.yview)
+    def make_scrollable_tab(self, parent_frame):
+        canvas = tk.Canvas(parent_frame)
+        scrollbar = ttk.Scrollbar(parent_frame, orient="vertical", command=canvas.yview)
         scrollable_content = ttk.Frame(canvas)
-        
-        def configure_scroll_region(event):
-            canvas.configure(scrollregion=canvas.bbox("all"))
-            
-        def configure_canvas_window(event):
-            canvas.itemconfig(canvas_window, width=event.width)
-        
-        scrollable_content.bind("<Configure>", configure_scroll_region)
-        canvas.bind("<Configure>", configure_canvas_window)
-        
         canvas_window = canvas.create_window((0, 0), window=scrollable_content, anchor="nw")
+        
+        scrollable_content.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.bind("<Configure>", lambda e: canvas.itemconfig(canvas_window, width=e.width))
         canvas.configure(yscrollcommand=scrollbar.set)
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
-        scrollable_frame.pack(fill=tk.BOTH, expand=True)
+        return scrollable_content
+        
+    def setup_learning_practice_tab(self):
+        learning_frame = ttk.Frame(self.edu_notebook)
+        self.edu_notebook.add(learning_frame, text="■ Learn & Practice")
         
-        scrollable_frame.columnconfigure(0, weight=1)
-        scrollable_frame.rowconfigure(0, weight=1)
+        scrollable_content = self.make_scrollable_tab(learning_frame)
         
         settings_frame = ttk.LabelFrame(scrollable_content, text="⚙ Study Settings", padding="5")
         settings_frame.pack(fill=tk.X, pady=5, padx=5)
@@ -3320,32 +2721,23 @@ class ChatbotApp:
         scrollable_content.columnconfigure(0, weight=1)
         
     def setup_assessment_tab(self):
-        assessment_frame = ttk.Frame(self.edu_notebook)
-        self.edu_notebook.add(assessment_frame, text="▲ Assess & Review")
-        
-        scrollable_frame = ttk.Frame(assessment_frame)
-        canvas = tk.Canvas(scrollable_frame)
-        scrollbar = ttk.Scrollbar(scrollable_frame, orient="vertical", command=canvas.yview)
-        scrollable_content = ttk.Frame(canvas)
-        
-        def configure_scroll_region(event):
-            canvas.configure(scrollregion=canvas.bbox("all"))
-            
-        def configure_canvas_window(event):
-            canvas.itemconfig(canvas_window, width=event.width)
-        
-        scrollable_content.bind("<Configure>", configure_scroll_region)
-        canvas.bind("<Configure>", configure_canvas_window)
-        
-        canvas_window = canvas.create_window((0, 0), window=scrollable_content, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        scrollable_frame.pack(fill=tk.BOTH, expand=True)
+        # The assessment tools are built the first time their tab is opened
+        self.assessment_frame = ttk.Frame(self.edu_notebook)
+        self.edu_notebook.add(self.assessment_frame, text="▲ Assess & Review")
+        self.mini_stats_display = None
+        self.mini_stats_text = None
+        self.edu_notebook.bind("<<NotebookTabChanged>>", self.load_edu_tab_content)
+        
+    def load_edu_tab_content(self, event=None):
+        if self.mini_stats_display is not None:
+            return
+        if self.edu_notebook.select() != str(self.assessment_frame):
+            return
+        self.build_assessment_tab(self.assessment_frame)
+        self.refresh_mini_progress()
         
-        scrollable_frame.columnconfigure(0, weight=1)
-        scrollable_frame.rowconfigure(0, weight=1)
+    def build_assessment_tab(self, assessment_frame):
+        scrollable_content = self.make_scrollable_tab(assessment_frame)
         
         test_frame = ttk.LabelFrame(scrollable_content, text="▪ Assessments", padding="5")
         test_frame.pack(fill=tk.X, pady=5, padx=5)
@@ -3388,52 +2780,146 @@ class ChatbotApp:
             self.max_output_tokens = 512
             
     def update_input_tokens(self, event=None):
-        text = self.input_text.get("1.0", tk.END).strip()
-        tokens = self.token_manager.count_text_tokens(text)
+        # Coalesce bursts of keystrokes into one recount
+        if self.input_token_job:
+            self.root.after_cancel(self.input_token_job)
+        self.input_token_job = self.root.after(50, self.recount_input_tokens)
+        
+    def recount_input_tokens(self):
+        self.input_token_job = None
+        text = self.snapshot_inputs()[0]
+        old_text, old_count = self.input_token_state
+        tokens = self.token_manager.recount_text_tokens(old_text, old_count, text)
+        self.input_token_state = (text, tokens)
         color = self.token_manager.get_color_for_usage(tokens)
         self.input_token_label.config(text=f"Input: {tokens} tokens", foreground=color)
         
     def update_context_tokens(self, event=None):
-        context_text = self.context_display.get("1.0", tk.END).strip()
-        tokens = self.token_manager.count_text_tokens(context_text)
+        # Context edits are often large pastes; count once the burst is over
+        if self.context_token_job:
+            self.root.after_cancel(self.context_token_job)
+        self.context_token_job = self.root.after(200, self.recount_context_tokens)
+        
+    def recount_context_tokens(self):
+        self.context_token_job = None
+        context_text = self.snapshot_inputs()[1]
+        # Pasted documents can take a noticeable while to encode, so count them on
+        # TOKEN_POOL; a newer edit replaces any count still waiting to start
+        if self.context_token_future:
+            self.context_token_future.cancel()
+        future = TOKEN_POOL.submit(self.token_manager.count_text_tokens, context_text)
+        self.context_token_future = future
+        future.add_done_callback(lambda f: self.root.after(0, self.apply_context_tokens, f))
+        
+    def apply_context_tokens(self, future):
+        if future is not self.context_token_future or future.cancelled() or future.exception():
+            return
+        self.context_token_future = None
+        tokens = future.result()
         color = self.token_manager.get_color_for_usage(tokens)
         self.context_info_label.config(text=f"Context: {tokens} tokens", foreground=color)
         
-    def calculate_total_input_tokens(self):
-        text_tokens = self.token_manager.count_text_tokens(self.input_text.get("1.0", tk.END).strip())
-        context_tokens = self.token_manager.count_text_tokens(self.context_display.get("1.0", tk.END).strip())
+    def on_input_modified(self, event=None):
+        self.input_snapshot = None
+        self.input_text.edit_modified(False)
+        
+    def on_context_modified(self, event=None):
+        self.context_snapshot = None
+        self.context_display.edit_modified(False)
+        
+    def snapshot_inputs(self):
+        # Token refreshes fire from many handlers; only copy text out of Tk after an edit
+        if self.input_snapshot is None:
+            self.input_snapshot = self.input_text.get("1.0", tk.END).strip()
+        return self.input_snapshot, self.get_context_text()
+        
+    def get_context_text(self):
+        if self.context_snapshot is None:
+            self.context_snapshot = self.context_display.get("1.0", tk.END).strip()
+        return self.context_snapshot
+        
+    def calculate_total_input_tokens(self, text=None, context_text=None):
+        if text is None or context_text is None:
+            text, context_text = self.snapshot_inputs()
+        text_tokens = self.token_manager.count_text_tokens(text)
+        context_tokens = self.token_manager.count_text_tokens(context_text)
         
         try:
             max_messages = int(self.history_messages_var.get())
         except:
             max_messages = 10
-        recent_history = self.chat_history[-max_messages:] if len(self.chat_history) > max_messages else self.chat_history
-        history_tokens = sum(entry.get('tokens', 0) for entry in recent_history)
+        history_tokens = self.get_history_tokens(max_messages)
+        
+        attachment_tokens = sum(self.get_attachment_tokens(a) for a in self.attachments)
         
-        image_count = sum(1 for a in self.attachments if a['type'] == 'image')
-        image_tokens = self.token_manager.count_image_tokens(image_count)
+        return text_tokens + context_tokens + history_tokens + attachment_tokens
         
-        audio_tokens = 0
-        for attachment in self.attachments:
-            if attachment['type'] == 'audio':
+    def get_history_tokens(self, max_messages):
+        # Running totals over every entry but the newest (whose count is patched once
+        # it finishes streaming), so the last-N window is a subtraction, not a re-sum
+        history = self.chat_history
+        if not history:
+            return 0
+        entries = self.history_token_entries
+        totals = self.history_token_totals
+        covered = len(entries)
+        if covered > len(history) - 1 or (covered and history[covered - 1] is not entries[-1]):
+            # History was cleared or shortened somewhere, start over
+            del entries[:]
+            del totals[1:]
+            covered = 0
+        for i in range(covered, len(history) - 1):
+            entries.append(history[i])
+            totals.append(totals[-1] + history[i].get('tokens', 0))
+        start = max(0, len(history) - max_messages) if max_messages > 0 else 0
+        return totals[-1] - totals[start] + history[-1].get('tokens', 0)
+        
+    def get_role_counts(self):
+        # Extended with only the entries added since the last call, like the token totals
+        history = self.chat_history
+        counts = self.history_role_counts
+        covered = self.history_role_covered
+        if covered > len(history) or (covered and history[covered - 1] is not self.history_role_last):
+            counts.clear()
+            covered = 0
+        for i in range(covered, len(history)):
+            role = history[i].get('role')
+            counts[role] = counts.get(role, 0) + 1
+        self.history_role_covered = len(history)
+        self.history_role_last = history[-1] if history else None
+        return counts
+        
+    def get_attachment_tokens(self, attachment):
+        # An attachment's cost never changes, so audio files are only probed once
+        tokens = attachment.get('tokens')
+        if tokens is None:
+            if attachment['type'] == 'image':
+                tokens = self.token_manager.count_image_tokens(1)
+            elif attachment['type'] == 'audio':
                 try:
-                    audio_info = sf.info(attachment['audio'])
-                    duration = audio_info.duration
-                    audio_tokens += self.token_manager.count_audio_tokens(duration)
+                    tokens = self.token_manager.count_audio_tokens(sf.info(attachment['audio']).duration)
                 except:
-                    audio_tokens += 100
-                    
-        return text_tokens + context_tokens + history_tokens + image_tokens + audio_tokens
+                    tokens = 100
+            else:
+                tokens = 0
+            attachment['tokens'] = tokens
+        return tokens
         
     def update_token_display(self):
+        # Several handlers can dirty the counts in one burst; redraw once for all of them
+        if not self.token_refresh_pending:
+            self.token_refresh_pending = True
+            self.root.after(30, self.refresh_token_display)
+            
+    def refresh_token_display(self):
+        self.token_refresh_pending = False
         total_input = self.calculate_total_input_tokens()
         
         try:
             max_messages = int(self.history_messages_var.get())
         except:
             max_messages = 10
-        recent_history = self.chat_history[-max_messages:] if len(self.chat_history) > max_messages else self.chat_history
-        history_tokens = sum(entry.get('tokens', 0) for entry in recent_history)
+        history_tokens = self.get_history_tokens(max_messages)
         
         total_tokens = total_input
         remaining_tokens = self.token_manager.max_context_tokens - total_tokens
@@ -3441,9 +2927,6 @@ class ChatbotApp:
         
         color = self.token_manager.get_color_for_usage(total_tokens)
         
-        self.token_display.config(state=tk.NORMAL)
-        self.token_display.delete(1.0, tk.END)
-        
         status_text = f"Total: {total_tokens:,}/{self.token_manager.max_context_tokens:,} tokens ({usage_percent:.1f}%) | "
         status_text += f"Remaining: {remaining_tokens:,} | Input: {total_input - history_tokens:,} | History: {history_tokens:,}"
         
@@ -3452,6 +2935,14 @@ class ChatbotApp:
         elif total_tokens > self.token_manager.max_context_tokens * 0.75:
             status_text += f"\nNotice: High token usage. Monitor context length."
             
+        # Focus changes and unrelated edits often land on the same totals; leave the
+        # widget alone when nothing it shows has changed
+        if (status_text, color) == self.token_display_state:
+            return
+        self.token_display_state = (status_text, color)
+        
+        self.token_display.config(state=tk.NORMAL)
+        self.token_display.delete(1.0, tk.END)
         self.token_display.insert(1.0, status_text)
         self.token_display.tag_add('token_info', 1.0, tk.END)
         self.token_display.tag_config('token_info', foreground=color, font=('Arial', 9, 'bold'))
@@ -3491,6 +2982,20 @@ class ChatbotApp:
         elif action == "offline_mode_changed":
             self.update_status_for_offline_mode()
             
+    def run_in_loader(self, job):
+        if self.loader_thread is None:
+            self.loader_thread = threading.Thread(target=self.loader_loop, daemon=True)
+            self.loader_thread.start()
+        self.loader_queue.put(job)
+        
+    def loader_loop(self):
+        while True:
+            job = self.loader_queue.get()
+            try:
+                job()
+            except:
+                pass
+                
     def load_specific_model(self, model_name):
         if self.is_generating:
             messagebox.showwarning("Generation Active", "Please stop current generation before changing models.")
@@ -3501,21 +3006,39 @@ class ChatbotApp:
         
         def load_thread():
             try:
-                def progress_callback(message):
-                    self.root.after(0, lambda: self.status_label.config(text=message, foreground='blue'))
+                def progress_callback(message, percent=None):
+                    self.post_status(message, 'blue')
                     
                 model, tokenizer = self.model_manager.load_model(model_name, progress_callback)
                 
-                self.root.after(0, lambda: self.model_load_complete(model, tokenizer, model_name))
+                self.root.after(0, self.model_load_complete, model, tokenizer, model_name)
                 
             except Exception as e:
-                self.root.after(0, lambda: self.model_load_error(str(e)))
+                self.root.after(0, self.model_load_error, str(e))
                 
-        threading.Thread(target=load_thread, daemon=True).start()
+        self.run_in_loader(load_thread)
+        
+    def set_status(self, text, color):
+        self.status_label.config(text=text, foreground=color)
+        
+    def post_status(self, text, color):
+        # Loaders report progress many times a second from their threads; keep only
+        # the newest message and apply it once per pass of the event loop
+        self.pending_status = (text, color)
+        if not self.status_wakeup.is_set():
+            self.status_wakeup.set()
+            self.root.after(0, self.flush_status)
+            
+    def flush_status(self):
+        self.status_wakeup.clear()
+        self.set_status(*self.pending_status)
         
     def model_load_complete(self, model, tokenizer, model_name):
         self.model = model
         self.tokenizer = tokenizer
+        self.prompt_cache.clear()
+        self.kv_cache.clear()
+        self.generation_kwargs = get_generation_kwargs(tokenizer)
         self.current_model_name = model_name
         self.model_loaded = True
         
@@ -3553,6 +3076,16 @@ class ChatbotApp:
             self.send_btn.config(state=tk.NORMAL)
             self.stop_btn.config(state=tk.DISABLED, text="⏹ Stop")
         
+    def schedule_history_context(self, event=None):
+        # Holding a spinbox arrow or typing a number fires a burst of events; rebuild once
+        if not self.history_context_job:
+            self.history_context_job = self.root.after_idle(self.refresh_history_context)
+            
+    def refresh_history_context(self):
+        self.history_context_job = None
+        self.update_history_context()
+        self.update_token_display()
+        
     def update_history_context(self):
         try:
             max_messages = int(self.history_messages_var.get())
@@ -3561,29 +3094,46 @@ class ChatbotApp:
             
         recent_history = self.chat_history[-max_messages:] if len(self.chat_history) > max_messages else self.chat_history
         
-        self.history_context_display.config(state=tk.NORMAL)
-        self.history_context_display.delete(1.0, tk.END)
-        
-        history_text = ""
-        total_tokens = 0
-        
-        for entry in recent_history:
-            role = entry.get('role', 'unknown')
-            content = entry.get('content', '')
-            tokens = entry.get('tokens', 0)
+        # Each shown message carries its own tag, so sliding the window only deletes the
+        # rows that fell off the front and appends the new ones
+        rows = self.history_context_rows
+        drop = next((i for i, row in enumerate(rows) if recent_history and row[0] is recent_history[0]), None)
+        kept = rows[drop:] if drop is not None else []
+        if (drop is None or len(kept) > len(recent_history)
+                or any(row[0] is not entry for row, entry in zip(kept, recent_history))
+                or kept[-1][1] != self.format_history_row(kept[-1][0])):
+            drop = len(rows)
+            kept = []
             
-            history_text += f"{role.upper()}: {content}\n\n"
-            total_tokens += tokens
-            
-        self.history_context_display.insert(1.0, history_text)
+        self.history_context_display.config(state=tk.NORMAL)
+        if not kept:
+            self.history_context_display.delete(1.0, tk.END)
+        for row in rows[:drop]:
+            ranges = self.history_context_display.tag_ranges(row[2])
+            if ranges:
+                self.history_context_display.delete(ranges[0], ranges[-1])
+            self.history_context_display.tag_delete(row[2])
+            
+        new_rows = []
+        for entry in recent_history[len(kept):]:
+            self.history_context_tag_seq += 1
+            new_rows.append((entry, self.format_history_row(entry), f"history_row{self.history_context_tag_seq}"))
+        if new_rows:
+            self.history_context_display.insert(tk.END, *[part for row in new_rows for part in row[1:]])
         self.history_context_display.config(state=tk.DISABLED)
+        self.history_context_rows = kept + new_rows
         
+        total_tokens = self.get_history_tokens(max_messages)
         color = self.token_manager.get_color_for_usage(total_tokens)
         self.history_info_label.config(text=f"History: {total_tokens} tokens ({len(recent_history)} messages)", foreground=color)
         
+    def format_history_row(self, entry):
+        return f"{entry.get('role', 'unknown').upper()}: {entry.get('content', '')}\n\n"
+        
     def clear_chat_history(self):
         if messagebox.askyesno("Clear History", "Are you sure you want to clear all chat history?"):
             self.chat_history.clear()
+            self.kv_cache.clear()
             self.update_history_context()
             self.update_token_display()
         
@@ -3600,59 +3150,93 @@ class ChatbotApp:
                 is_online = self.model_manager.is_online()
                 
                 if offline_mode and not self.model_manager.is_model_downloaded(last_used_model):
-                    self.root.after(0, lambda: self.status_label.config(
-                        text="❌ Offline mode enabled but no models downloaded. Use Model Manager to download.", 
-                        foreground='red'))
-                    self.root.after(0, lambda: self.add_system_message(
+                    self.root.after(0, self.set_status,
+                        "❌ Offline mode enabled but no models downloaded. Use Model Manager to download.", 'red')
+                    self.root.after(0, self.add_system_message,
                         "⚠️ Offline mode is enabled but no models are downloaded. Click '🤖 Model Manager' to download models for offline use.", 
-                        error=True))
+                        True)
                     return
                     
                 if not is_online and not self.model_manager.is_model_downloaded(last_used_model):
-                    self.root.after(0, lambda: self.status_label.config(
-                        text="❌ No internet connection and no local models. Cannot load AI model.", 
-                        foreground='red'))
-                    self.root.after(0, lambda: self.add_system_message(
+                    self.root.after(0, self.set_status,
+                        "❌ No internet connection and no local models. Cannot load AI model.", 'red')
+                    self.root.after(0, self.add_system_message,
                         "⚠️ No internet connection and no local models available. Connect to internet to download models.", 
-                        error=True))
+                        True)
                     return
                 
-                def progress_callback(message):
-                    self.root.after(0, lambda: self.status_label.config(text=message, foreground='blue'))
+                def progress_callback(message, percent=None):
+                    self.post_status(message, 'blue')
                 
-                self.root.after(0, lambda: self.status_label.config(text="Initializing AI model...", foreground='orange'))
+                self.root.after(0, self.set_status, "Initializing AI model...", 'orange')
                 
                 # Load the model
                 model, tokenizer = self.model_manager.load_model(last_used_model, progress_callback)
                 
                 # Update UI on main thread
-                self.root.after(0, lambda: self.model_load_complete(model, tokenizer, last_used_model))
+                self.root.after(0, self.model_load_complete, model, tokenizer, last_used_model)
                 
             except Exception as e:
-                error_msg = str(e)
-                self.root.after(0, lambda: self.model_load_error(error_msg))
+                self.root.after(0, self.model_load_error, str(e))
         
-        threading.Thread(target=load_model, daemon=True).start()
+        self.run_in_loader(load_model)
         
     def setup_clipboard_monitor(self):
         self.last_clipboard = ""
-        self.clipboard_images = set()
+        # Difference hashes of recently seen clipboard images, oldest first
+        self.clipboard_images = collections.OrderedDict()
+        self.clipboard_images_size = 64
+        self.clipboard_change_count = None
+        
+    def poll_background(self):
+        # Responses wake the UI through wake_response_queue; this slow tick only
+        # watches the clipboard and drains anything a missed wake-up left behind
+        self.check_response_queue()
         self.check_clipboard()
+        self.root.after(1000, self.poll_background)
+        
+    def wake_response_queue(self):
+        # Runs on the generation thread after every put; one pending drain covers
+        # all chunks queued before it runs
+        if not self.response_wakeup.is_set():
+            self.response_wakeup.set()
+            self.root.after(0, self.drain_response_queue)
+            
+    def drain_response_queue(self):
+        self.response_wakeup.clear()
+        self.check_response_queue()
         
     def check_clipboard(self):
         try:
+            # Where the OS exposes a clipboard change counter, only grab the payload
+            # after it moves
+            change_count = get_clipboard_change_count()
+            if change_count is not None and change_count == self.clipboard_change_count:
+                return
+            self.clipboard_change_count = change_count
+            
             image = ImageGrab.grabclipboard()
-            if image and id(image) not in self.clipboard_images:
-                self.clipboard_images.add(id(image))
-                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                    image.save(tmp.name)
-                    self.attachments.append({"type": "image", "image": tmp.name})
-                    self.update_attachment_label()
-                    self.update_token_display()
-                    self.add_system_message("Image from clipboard added", attachment=True)
+            if isinstance(image, Image.Image) and self.is_new_clipboard_image(image):
+                self.attach_image(image, "Image from clipboard added")
         except:
             pass
-        self.root.after(1000, self.check_clipboard)
+        
+    def is_new_clipboard_image(self, image):
+        # 64-bit dHash on a 9x8 grayscale thumbnail: cheap to compute and stable when
+        # the same picture is copied again
+        pixels = image.convert('L').resize((9, 8), Image.BILINEAR).tobytes()
+        image_hash = 0
+        for row in range(8):
+            for col in range(8):
+                image_hash = (image_hash << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+                
+        if image_hash in self.clipboard_images:
+            self.clipboard_images.move_to_end(image_hash)
+            return False
+        self.clipboard_images[image_hash] = None
+        if len(self.clipboard_images) > self.clipboard_images_size:
+            self.clipboard_images.popitem(last=False)
+        return True
         
     def add_system_message(self, message, error=False, attachment=False):
         self.chat_display.config(state=tk.NORMAL)
@@ -3696,14 +3280,15 @@ class ChatbotApp:
             messagebox.showwarning("Generation Active", "Please wait for the current generation to complete or stop it first.")
             return
             
-        total_input_tokens = self.calculate_total_input_tokens()
+        # Read both boxes straight from Tk; <<Modified>> is delivered on a later event
+        # loop pass, so the snapshots can still hold text from before an edit
+        text = self.input_text.get("1.0", tk.END).strip()
+        context_text = self.context_display.get("1.0", tk.END).strip()
+        total_input_tokens = self.calculate_total_input_tokens(text, context_text)
         if total_input_tokens > self.token_manager.max_context_tokens:
             messagebox.showerror("Token Limit Exceeded", 
-                               f"Input tokens ({total_input_tokens:,}) exceed the 32K limit. Please reduce context or attachments.")
+                               f"Input tokens ({total_input_tokens:,}) exceed the {self.token_manager.max_context_tokens:,} limit. Please reduce context or attachments.")
             return
-            
-        text = self.input_text.get("1.0", tk.END).strip()
-        context_text = self.context_display.get("1.0", tk.END).strip()
         
         if not text and not context_text:
             messagebox.showwarning("Empty Message", "Please enter a message or add context.")
@@ -3746,12 +3331,15 @@ class ChatbotApp:
             self.add_system_message(f"Note: {len(self.attachments)} attachment(s) stored but not sent to model (format compatibility)", attachment=True)
         
         self.input_text.delete("1.0", tk.END)
+        self.input_snapshot = None
         self.attachments = []
         self.update_attachment_label()
         self.update_token_display()
         self.update_history_context()
         
-        self.current_generation_thread = ModelThread(self.model, self.tokenizer, messages, self.response_queue, self.max_output_tokens)
+        self.current_generation_thread = ModelThread(self.model, self.tokenizer, messages, self.response_queue,
+                                                     self.max_output_tokens, self.prompt_cache, self.kv_cache,
+                                                     self.generation_kwargs)
         self.current_generation_thread.start()
         
         self.update_ui_for_generation(True)
@@ -3759,19 +3347,17 @@ class ChatbotApp:
         self.status_label.config(text="Generating response...", foreground='blue')
         
     def check_response_queue(self):
+        # Streamed chunks are collected per tick and written with a single insert
+        chunks = []
         try:
             while True:
                 msg_type, content = self.response_queue.get_nowait()
                 if msg_type == 'chunk':
-                    self.chat_display.config(state=tk.NORMAL)
-                    self.chat_display.insert(tk.END, content)
-                    self.chat_display.see(tk.END)
-                    self.chat_display.config(state=tk.DISABLED)
+                    chunks.append(content)
+                    continue
                     
-                    if self.chat_history and self.chat_history[-1]['role'] == 'assistant':
-                        self.chat_history[-1]['content'] += content
-                        
-                elif msg_type == 'complete':
+                self.flush_response_chunks(chunks)
+                if msg_type == 'complete':
                     self.chat_display.config(state=tk.NORMAL)
                     
                     if self.chat_history and self.chat_history[-1]['role'] == 'assistant':
@@ -3815,16 +3401,36 @@ class ChatbotApp:
                     self.update_ui_for_generation(False)
         except queue.Empty:
             pass
-        self.root.after(50, self.check_response_queue)
+        self.flush_response_chunks(chunks)
+        
+    def flush_response_chunks(self, chunks):
+        if not chunks:
+            return
+        text = "".join(chunks)
+        chunks.clear()
+        
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, text)
+        self.chat_display.see(tk.END)
+        self.chat_display.config(state=tk.DISABLED)
+        
+        if self.chat_history and self.chat_history[-1]['role'] == 'assistant':
+            self.chat_history[-1]['content'] += text
         
     def select_image(self):
         file_paths = filedialog.askopenfilenames(
             title="Select Images",
             filetypes=[("Image files", "*.png *.jpg *.jpeg *.gif *.bmp")]
         )
+        if not file_paths:
+            return
         for file_path in file_paths:
-            self.attachments.append({"type": "image", "image": file_path})
-            self.add_system_message(f"Image added: {os.path.basename(file_path)} (256 tokens)", attachment=True)
+            self.attachments.append({"type": "image", "image": file_path, "tokens": self.token_manager.image_tokens})
+        # One line for the whole selection rather than one per file
+        if len(file_paths) == 1:
+            self.add_system_message(f"Image added: {os.path.basename(file_paths[0])} ({self.token_manager.image_tokens} tokens)", attachment=True)
+        else:
+            self.add_system_message(f"{len(file_paths)} images added ({self.token_manager.count_image_tokens(len(file_paths))} tokens)", attachment=True)
         self.update_attachment_label()
         self.update_token_display()
         
@@ -3843,29 +3449,61 @@ class ChatbotApp:
                 ("All files", "*.*")
             ]
         )
+        # Reading headers can be slow on network drives, so probe the files on IO_POOL
+        if file_paths:
+            future = IO_POOL.submit(self.probe_audio_files, file_paths)
+            future.add_done_callback(lambda f: self.root.after(0, self.add_audio_files, f.result()))
+            
+    def probe_audio_files(self, file_paths):
+        results = []
         for file_path in file_paths:
             try:
-                # Get audio duration for token calculation
-                try:
-                    audio_info = sf.info(file_path)
-                    duration = audio_info.duration
-                    audio_tokens = int(duration * self.token_manager.audio_tokens_per_second)
-                except Exception as e:
-                    # Fallback for unsupported formats - estimate based on file size
-                    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-                    estimated_duration = file_size_mb * 60  # Rough estimate: 1MB ≈ 1 minute
-                    duration = min(estimated_duration, 300)  # Cap at 5 minutes for safety
-                    audio_tokens = int(duration * self.token_manager.audio_tokens_per_second)
-                    print(f"Warning: Could not read audio info for {file_path}, using estimate")
-                
-                self.attachments.append({"type": "audio", "audio": file_path})
-                self.add_system_message(f"Audio file added: {os.path.basename(file_path)} ({duration:.1f}s, {audio_tokens} tokens)", attachment=True)
-                
+                results.append((file_path, self.probe_audio_duration(file_path), None))
             except Exception as e:
-                messagebox.showerror("Audio Error", f"Could not process audio file {os.path.basename(file_path)}: {str(e)}")
-                
-        self.update_attachment_label()
-        self.update_token_display()
+                results.append((file_path, None, e))
+        return results
+            
+    def probe_audio_duration(self, file_path):
+        # Get audio duration for token calculation
+        if mutagen and os.path.splitext(file_path)[1].lower() not in SOUNDFILE_AUDIO_EXTENSIONS:
+            try:
+                audio = mutagen.File(file_path)
+                if audio is not None and audio.info.length:
+                    return audio.info.length
+            except Exception:
+                pass
+        try:
+            return sf.info(file_path).duration
+        except Exception:
+            # Fallback for unsupported formats - estimate based on file size
+            file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+            estimated_duration = file_size_mb * 60  # Rough estimate: 1MB ≈ 1 minute
+            print(f"Warning: Could not read audio info for {file_path}, using estimate")
+            return min(estimated_duration, 300)  # Cap at 5 minutes for safety
+            
+    def add_audio_files(self, results):
+        added = []
+        errors = []
+        for file_path, duration, error in results:
+            if error:
+                errors.append(f"{os.path.basename(file_path)}: {str(error)}")
+                continue
+            audio_tokens = int(duration * self.token_manager.audio_tokens_per_second)
+            self.attachments.append({"type": "audio", "audio": file_path, "tokens": audio_tokens})
+            added.append((file_path, duration, audio_tokens))
+            
+        if len(added) == 1:
+            file_path, duration, audio_tokens = added[0]
+            self.add_system_message(f"Audio file added: {os.path.basename(file_path)} ({duration:.1f}s, {audio_tokens} tokens)", attachment=True)
+        elif added:
+            total_duration = sum(duration for _, duration, _ in added)
+            total_tokens = sum(tokens for _, _, tokens in added)
+            self.add_system_message(f"{len(added)} audio files added ({total_duration:.1f}s, {total_tokens} tokens)", attachment=True)
+        if added:
+            self.update_attachment_label()
+            self.update_token_display()
+        if errors:
+            messagebox.showerror("Audio Error", "Could not process audio files:\n" + "\n".join(errors))
         
     def select_document(self):
         file_path = filedialog.askopenfilename(
@@ -3888,36 +3526,52 @@ class ChatbotApp:
                 messagebox.showerror("Document Error", f"Could not open document: {str(e)}")
                 
     def on_document_processed(self, text_content, pages):
-        self.chat_context = text_content
+        # The editable context box is the only copy of the document text we keep
         self.context_pages = pages
         
         self.context_display.delete(1.0, tk.END)
         self.context_display.insert(tk.END, text_content)
-        
-        tokens = self.token_manager.count_text_tokens(text_content)
-        color = self.token_manager.get_color_for_usage(tokens)
+        self.context_snapshot = None
         
         if len(pages) > 1:
             pages_str = f"pages {min(pages)}-{max(pages)}" if pages else "document"
         else:
             pages_str = "document"
-        self.context_info_label.config(text=f"Context: {tokens} tokens from {pages_str}", foreground=color)
+            
+        # Whole textbooks take a while to encode, so count on TOKEN_POOL like edits do
+        if self.context_token_future:
+            self.context_token_future.cancel()
+        future = TOKEN_POOL.submit(self.token_manager.count_text_tokens, text_content)
+        self.context_token_future = future
+        future.add_done_callback(lambda f: self.root.after(0, self.document_tokens_counted, f, pages_str))
         
+    def document_tokens_counted(self, future, pages_str):
+        if future.cancelled() or future.exception():
+            return
+        tokens = future.result()
+        if future is self.context_token_future:
+            self.context_token_future = None
+            color = self.token_manager.get_color_for_usage(tokens)
+            self.context_info_label.config(text=f"Context: {tokens} tokens from {pages_str}", foreground=color)
+            
         self.add_system_message(f"Document context loaded: {tokens} tokens", attachment=True)
         self.update_token_display()
         
     def clear_context(self):
-        self.chat_context = ""
         self.context_pages = []
+        if self.context_token_future:
+            self.context_token_future.cancel()
+            self.context_token_future = None
         
         self.context_display.delete(1.0, tk.END)
+        self.context_snapshot = None
         
         self.context_info_label.config(text="Context: 0 tokens", foreground='gray')
         self.add_system_message("Chat context cleared", attachment=True)
         self.update_token_display()
         
     def save_context(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         if not context_text:
             messagebox.showwarning("No Context", "No context to save")
             return
@@ -3928,12 +3582,18 @@ class ChatbotApp:
             filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
         )
         if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(context_text)
-                self.add_system_message(f"Context saved to: {os.path.basename(file_path)}", attachment=True)
-            except Exception as e:
-                messagebox.showerror("Save Error", f"Could not save context: {str(e)}")
+            future = IO_POOL.submit(self.write_context_file, file_path, context_text)
+            future.add_done_callback(lambda f: self.root.after(0, self.save_context_complete, file_path, f.exception()))
+            
+    def write_context_file(self, file_path, context_text):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(context_text)
+            
+    def save_context_complete(self, file_path, error):
+        if error:
+            messagebox.showerror("Save Error", f"Could not save context: {str(error)}")
+        else:
+            self.add_system_message(f"Context saved to: {os.path.basename(file_path)}", attachment=True)
                 
     def load_context(self):
         file_path = filedialog.askopenfilename(
@@ -3941,54 +3601,120 @@ class ChatbotApp:
             filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
         )
         if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                self.context_display.delete(1.0, tk.END)
-                self.context_display.insert(tk.END, content)
-                
-                tokens = self.token_manager.count_text_tokens(content)
-                color = self.token_manager.get_color_for_usage(tokens)
-                self.context_info_label.config(text=f"Context: {tokens} tokens from {os.path.basename(file_path)}", foreground=color)
-                self.add_system_message(f"Context loaded from: {os.path.basename(file_path)} ({tokens} tokens)", attachment=True)
-                self.update_token_display()
-            except Exception as e:
-                messagebox.showerror("Load Error", f"Could not load context: {str(e)}")
+            future = IO_POOL.submit(self.read_context_file, file_path)
+            future.add_done_callback(lambda f: self.root.after(0, self.load_context_complete, file_path, f))
+            
+    def read_context_file(self, file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return content, self.token_manager.count_text_tokens(content)
+        
+    def load_context_complete(self, file_path, future):
+        error = future.exception()
+        if error:
+            messagebox.showerror("Load Error", f"Could not load context: {str(error)}")
+            return
+            
+        content, tokens = future.result()
+        self.context_display.delete(1.0, tk.END)
+        self.context_display.insert(tk.END, content)
+        self.context_snapshot = None
+        
+        color = self.token_manager.get_color_for_usage(tokens)
+        self.context_info_label.config(text=f"Context: {tokens} tokens from {os.path.basename(file_path)}", foreground=color)
+        self.add_system_message(f"Context loaded from: {os.path.basename(file_path)} ({tokens} tokens)", attachment=True)
+        self.update_token_display()
             
     def toggle_recording(self):
         if not self.recording:
+            # Blocks are encoded to disk by a writer thread while recording, so stopping
+            # only has to flush the tail instead of encoding the whole take
+            self.audio_frames = 0
+            self.audio_blocks = queue.Queue()
+            self.audio_stream = None
+            self.audio_writer = None
+            self.audio_path = None
+            try:
+                # Open the device first; a missing microphone is the usual failure
+                self.audio_stream = sd.InputStream(
+                    callback=self.audio_callback,
+                    channels=1,
+                    samplerate=RECORDING_SAMPLE_RATE,
+                    # 16-bit blocks match the PCM_16 file as-is; 100 ms blocks keep
+                    # callbacks (and their copies) to ten a second
+                    dtype='int16',
+                    blocksize=RECORDING_SAMPLE_RATE // 10
+                )
+                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                    self.audio_path = tmp.name
+                sound_file = sf.SoundFile(self.audio_path, 'w', RECORDING_SAMPLE_RATE, 1, 'PCM_16')
+                self.audio_writer = threading.Thread(target=self.write_recording, args=(sound_file, self.audio_blocks), daemon=True)
+                self.audio_writer.start()
+                self.audio_stream.start()
+            except Exception as e:
+                self.abort_recording()
+                self.add_system_message(f"Could not start recording: {str(e)}", error=True)
+                return
             self.recording = True
             self.audio_btn.config(text="Stop Recording")
-            self.audio_data = []
-            self.audio_stream = sd.InputStream(
-                callback=self.audio_callback,
-                channels=1,
-                samplerate=44100
-            )
-            self.audio_stream.start()
             self.status_label.config(text="Recording audio...", foreground='red')
         else:
             self.recording = False
             self.audio_btn.config(text="Record Audio")
             self.audio_stream.stop()
             self.audio_stream.close()
+            self.audio_blocks.put(None)
+            self.audio_writer.join()
             self.save_audio()
             self.status_label.config(text="Ready", foreground='green')
             
+    def abort_recording(self):
+        if self.audio_stream:
+            try:
+                self.audio_stream.close()
+            except:
+                pass
+        if self.audio_writer:
+            self.audio_blocks.put(None)
+            self.audio_writer.join()
+        if self.audio_path:
+            try:
+                os.remove(self.audio_path)
+            except:
+                pass
+        self.audio_stream = None
+        self.audio_writer = None
+        self.audio_blocks = None
+        self.audio_path = None
+        
     def audio_callback(self, indata, frames, time, status):
-        self.audio_data.append(indata.copy())
+        # Runs on the audio thread: hand the block over and return, no disk I/O here
+        self.audio_blocks.put(indata.copy())
+        self.audio_frames += frames
         
+    def write_recording(self, sound_file, blocks):
+        with sound_file:
+            while True:
+                block = blocks.get()
+                if block is None:
+                    break
+                sound_file.write(block)
+                
     def save_audio(self):
-        if self.audio_data:
-            audio_array = np.concatenate(self.audio_data, axis=0)
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-                sf.write(tmp.name, audio_array, 44100)
-                duration = len(audio_array) / 44100
-                audio_tokens = int(duration * self.token_manager.audio_tokens_per_second)
-                self.attachments.append({"type": "audio", "audio": tmp.name})
-                self.add_system_message(f"Audio recorded: {duration:.1f}s ({audio_tokens} tokens)", attachment=True)
-                self.update_attachment_label()
-                self.update_token_display()
+        if self.audio_frames:
+            duration = self.audio_frames / RECORDING_SAMPLE_RATE
+            audio_tokens = int(duration * self.token_manager.audio_tokens_per_second)
+            self.attachments.append({"type": "audio", "audio": self.audio_path, "tokens": audio_tokens})
+            self.add_system_message(f"Audio recorded: {duration:.1f}s ({audio_tokens} tokens)", attachment=True)
+            self.update_attachment_label()
+            self.update_token_display()
+        else:
+            try:
+                os.remove(self.audio_path)
+            except:
+                pass
+        self.audio_blocks = None
+        self.audio_writer = None
                 
     def capture_screen(self):
         self.root.withdraw()
@@ -3999,12 +3725,24 @@ class ChatbotApp:
         
     def on_screen_captured(self, image):
         self.root.deiconify()
+        self.attach_image(image, f"Screen capture added: {image.width}x{image.height} ({self.token_manager.image_tokens} tokens)")
+        
+    def attach_image(self, image, message):
+        # Encoding a full-screen PNG takes long enough to stall the UI, so do it on
+        # IO_POOL; the lowest compression level is several times faster to write
         with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            image.save(tmp.name)
-            self.attachments.append({"type": "image", "image": tmp.name})
-            self.add_system_message(f"Screen capture added: {image.width}x{image.height} (256 tokens)", attachment=True)
-            self.update_attachment_label()
-            self.update_token_display()
+            path = tmp.name
+        future = IO_POOL.submit(image.save, path, 'PNG', compress_level=1)
+        future.add_done_callback(lambda f: self.root.after(0, self.image_saved, path, message, f.exception()))
+        
+    def image_saved(self, path, message, error):
+        if error:
+            self.add_system_message(f"Could not save image: {str(error)}", error=True)
+            return
+        self.attachments.append({"type": "image", "image": path, "tokens": self.token_manager.image_tokens})
+        self.add_system_message(message, attachment=True)
+        self.update_attachment_label()
+        self.update_token_display()
             
     def update_attachment_label(self):
         count = len(self.attachments)
@@ -4014,14 +3752,7 @@ class ChatbotApp:
             for a in self.attachments:
                 atype = a['type']
                 types[atype] = types.get(atype, 0) + 1
-                if atype == 'image':
-                    total_tokens += 256
-                elif atype == 'audio':
-                    try:
-                        audio_info = sf.info(a['audio'])
-                        total_tokens += int(audio_info.duration * self.token_manager.audio_tokens_per_second)
-                    except:
-                        total_tokens += 100
+                total_tokens += self.get_attachment_tokens(a)
             
             parts = []
             for t, c in types.items():
@@ -4042,6 +3773,7 @@ class ChatbotApp:
         self.chat_display.delete(1.0, tk.END)
         self.chat_display.config(state=tk.DISABLED)
         self.chat_history.clear()
+        self.kv_cache.clear()
         self.attachments = []
         self.current_generation_thread = None
         self.update_attachment_label()
@@ -4052,10 +3784,10 @@ class ChatbotApp:
         self.add_system_message("Chat cleared")
     
     def refresh_mini_progress(self):
-        self.mini_stats_display.config(state=tk.NORMAL)
-        self.mini_stats_display.delete(1.0, tk.END)
-        
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        if self.mini_stats_display is None:
+            return
+            
+        context_text = self.snapshot_inputs()[1]
         chat_count = len(self.chat_history)
         
         if self.use_general_mode.get():
@@ -4082,457 +3814,305 @@ class ChatbotApp:
         
         if chat_count > 0:
             stats_text += f"\n📚 ACTIVITY SUMMARY\n"
-            user_messages = sum(1 for msg in self.chat_history if msg.get('role') == 'user')
-            assistant_messages = sum(1 for msg in self.chat_history if msg.get('role') == 'assistant')
-            total_tokens = sum(msg.get('tokens', 0) for msg in self.chat_history)
+            role_counts = self.get_role_counts()
+            user_messages = role_counts.get('user', 0)
+            assistant_messages = role_counts.get('assistant', 0)
+            total_tokens = self.get_history_tokens(chat_count)
             
             stats_text += f"Questions Asked: {user_messages}\n"
             stats_text += f"Responses Received: {assistant_messages}\n"
             stats_text += f"Total Conversation: {total_tokens:,} tokens\n"
         else:
             stats_text += f"\nStart chatting to see activity statistics!"
+            
+        if stats_text == self.mini_stats_text:
+            return
+        self.mini_stats_text = stats_text
         
+        self.mini_stats_display.config(state=tk.NORMAL)
+        self.mini_stats_display.delete(1.0, tk.END)
         self.mini_stats_display.insert(1.0, stats_text)
         self.mini_stats_display.config(state=tk.DISABLED)
     
+    def study_materials_missing(self, context_text):
+        if context_text:
+            return False
+        messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+        return True
+    
+    def set_input_and_send(self, prompt):
+        self.input_text.replace("1.0", tk.END, prompt)
+        self.input_snapshot = None
+        self.send_message()
+    
     def explain_concept(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
-            subject = self.subject_var.get()
-            grade = self.grade_var.get()
-            difficulty = self.difficulty_var.get()
-            
-            prompt = f"Explain key concepts in {subject} for {grade} level at {difficulty} difficulty. Please:\n"
-            prompt += "1. Identify important concepts in this subject area\n"
-            prompt += "2. Provide clear, simple definitions\n"
-            prompt += "3. Give real-world examples\n"
-            prompt += "4. Break down complex parts step-by-step\n"
-            prompt += "5. Include common misconceptions to avoid\n"
-            prompt += "6. Suggest ways to remember these concepts\n"
-            prompt += "7. Provide practice questions\n\n"
-            
-            if context_text:
-                prompt += "Also consider any uploaded study materials in your explanation."
+            context_note = "Also consider any uploaded study materials in your explanation." if context_text else ""
+            prompt = EXPLAIN_CONCEPT_GENERAL_PROMPT.format(
+                subject=self.subject_var.get(), grade=self.grade_var.get(),
+                difficulty=self.difficulty_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Based on the uploaded study materials and our conversation, explain the key concepts covered. Please:\n"
-            prompt += "1. Identify the main concepts from the materials\n"
-            prompt += "2. Provide clear, simple definitions\n"
-            prompt += "3. Give real-world examples\n"
-            prompt += "4. Break down complex parts step-by-step\n"
-            prompt += "5. Include common misconceptions to avoid\n"
-            prompt += "6. Suggest ways to remember these concepts\n"
-            prompt += "7. Provide practice questions based on the material"
+            
+            prompt = EXPLAIN_CONCEPT_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def create_concept_map(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
-            subject = self.subject_var.get()
-            
-            prompt = f"Create a comprehensive concept map for key topics in {subject}. Structure it as:\n\n"
-            prompt += "MAIN CONCEPT: [Core subject concept]\n"
-            prompt += "├── Core Subtopic 1\n│   ├── Key Detail A\n│   ├── Key Detail B\n│   └── connects to → [Related Concept]\n"
-            prompt += "├── Core Subtopic 2\n│   ├── Important Point X\n│   └── Important Point Y\n"
-            prompt += "└── Core Subtopic 3\n    └── leads to → [Next Level Topic]\n\n"
-            prompt += "Include:\n1. Main concept at center\n"
-            prompt += "2. 3-5 major subtopics\n3. Key details under each subtopic\n"
-            prompt += "4. Clear relationships between concepts\n5. Real-world examples where relevant\n"
-            prompt += "6. Prerequisites and follow-up topics\n\n"
-            
-            if context_text:
-                prompt += "Also incorporate concepts from the uploaded study materials."
+            context_note = "Also incorporate concepts from the uploaded study materials." if context_text else ""
+            prompt = CONCEPT_MAP_GENERAL_PROMPT.format(subject=self.subject_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Create a comprehensive concept map based on the uploaded study materials and our conversation. Structure it as:\n\n"
-            prompt += "MAIN CONCEPT: [Identify from materials]\n"
-            prompt += "├── Core Subtopic 1\n│   ├── Key Detail A\n│   ├── Key Detail B\n│   └── connects to → [Related Concept]\n"
-            prompt += "├── Core Subtopic 2\n│   ├── Important Point X\n│   └── Important Point Y\n"
-            prompt += "└── Core Subtopic 3\n    └── leads to → [Next Level Topic]\n\n"
-            prompt += "Base the concept map entirely on the uploaded study materials and our conversation."
+            
+            prompt = CONCEPT_MAP_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def homework_hints(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
-            subject = self.subject_var.get()
-            
-            prompt = f"Provide homework hints for common {subject} problems by giving HINTS, not direct answers:\n\n"
-            prompt += f"For typical {subject} homework problems and concepts:\n\n"
-            
-            if context_text:
-                prompt += "Consider both general subject concepts and the uploaded study materials.\n\n"
-            
-            prompt += "For each topic/problem type, provide:\n"
-            prompt += "1. Guiding questions to help think through problems\n"
-            prompt += "2. Relevant concepts to review\n3. Similar example problems\n"
-            prompt += "4. Step-by-step approach without giving away answers\n"
-            prompt += "5. Common mistakes to avoid\n\n"
-            prompt += "Focus on helping learn and understand the process, not just getting answers."
+            context_note = "Consider both general subject concepts and the uploaded study materials.\n\n" if context_text else ""
+            prompt = HOMEWORK_HINTS_GENERAL_PROMPT.format(subject=self.subject_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Based on the uploaded study materials and our conversation, provide homework hints by giving HINTS, not direct answers:\n\n"
-            prompt += "Look at the study materials and our discussion to identify potential homework problems or concepts that need practice.\n\n"
-            prompt += "For each identified topic/problem type, provide:\n"
-            prompt += "1. Guiding questions to help think through problems\n"
-            prompt += "2. Relevant concepts to review\n3. Similar example problems\n"
-            prompt += "4. Step-by-step approach without giving away answers\n"
-            prompt += "5. Common mistakes to avoid\n\n"
-            prompt += "Focus on helping learn and understand the process from the materials."
+            
+            prompt = HOMEWORK_HINTS_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def step_by_step_help(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
             
-            prompt = f"Provide step-by-step guidance for common {subject} problems:\n\n"
-            
             if context_text:
-                prompt += "Consider both general subject problem types and any specific problems from the uploaded study materials.\n\n"
+                context_note = "Consider both general subject problem types and any specific problems from the uploaded study materials.\n\n"
             else:
-                prompt += f"Focus on typical {subject} problem types that students commonly encounter.\n\n"
+                context_note = f"Focus on typical {subject} problem types that students commonly encounter.\n\n"
+            prompt = STEP_BY_STEP_GENERAL_PROMPT.format(subject=subject, context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Provide step-by-step guidance based on the uploaded study materials and our conversation:\n\n"
-            prompt += "Based on the study materials, identify key problem types and provide detailed step-by-step solutions.\n\n"
-        
-        prompt += "For each problem type, break it down into clear steps:\n"
-        prompt += "Step 1: [What to do and why]\nStep 2: [Next action and reasoning]\nStep 3: [Continue...]\n\n"
-        prompt += "For each step, explain:\n- What to do\n- Why we do it\n"
-        prompt += "- What to look out for\n- How it connects to the next step\n\n"
-        prompt += "Include the reasoning behind each step to promote understanding and provide multiple examples."
+            
+            prompt = STEP_BY_STEP_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def find_similar_problems(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
             difficulty = self.difficulty_var.get()
             
-            prompt = f"Create 3-5 similar practice problems for {subject} at {difficulty} level:\n\n"
-            
             if context_text:
-                prompt += "Use both typical subject problem types and any specific problems from the uploaded study materials.\n\n"
+                context_note = "Use both typical subject problem types and any specific problems from the uploaded study materials.\n\n"
             else:
-                prompt += f"Focus on common {subject} problem types at {difficulty} level.\n\n"
+                context_note = f"Focus on common {subject} problem types at {difficulty} level.\n\n"
+            prompt = SIMILAR_PROBLEMS_GENERAL_PROMPT.format(subject=subject, difficulty=difficulty, context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Based on the uploaded study materials and our conversation, create 3-5 similar practice problems:\n\n"
-            prompt += "Use the study materials to identify key problem types, then create similar practice problems.\n\n"
-        
-        prompt += "For each similar problem:\n1. State the problem clearly\n"
-        prompt += "2. Vary the numbers/context while keeping the same concept\n"
-        prompt += "3. Include the solution approach\n4. Indicate the difficulty level\n"
-        prompt += "5. Note what concept it reinforces\n\n"
-        prompt += "Arrange them from easier to harder to build confidence and cover different variations of the same concept types."
+            
+            prompt = SIMILAR_PROBLEMS_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def generate_quiz(self):
         num_questions = int(self.quiz_count_var.get())
         quiz_type = self.quiz_type_var.get()
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
             difficulty = self.difficulty_var.get()
             
-            prompt = f"Create a {num_questions}-question {quiz_type} quiz for {subject} at {difficulty} level"
-            
             if context_text:
-                prompt += " incorporating both general subject concepts and the uploaded study materials.\n\n"
+                context_note = " incorporating both general subject concepts and the uploaded study materials.\n\n"
             else:
-                prompt += f" covering key {subject} concepts at {difficulty} level.\n\n"
+                context_note = f" covering key {subject} concepts at {difficulty} level.\n\n"
+            prompt = QUIZ_GENERAL_PROMPT.format(
+                num_questions=num_questions, quiz_type=quiz_type, subject=subject,
+                difficulty=difficulty, context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Create a {num_questions}-question {quiz_type} quiz based entirely on the uploaded study materials and our conversation.\n\n"
-        
-        prompt += "For each question:\n1. Create a clear, well-written question\n"
-        prompt += "2. Provide multiple choice options (A, B, C, D) if applicable\n"
-        prompt += "3. Indicate the correct answer\n4. Explain why the correct answer is right\n"
-        prompt += "5. Explain why wrong answers are incorrect\n6. Include difficulty level for each question\n\n"
-        prompt += "Make questions progressively challenging and cover different aspects of the material."
+            
+            prompt = QUIZ_MATERIALS_PROMPT.format(num_questions=num_questions, quiz_type=quiz_type)
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def adaptive_practice(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
-            difficulty = self.difficulty_var.get()
-            
-            prompt = f"Create an adaptive practice session for {subject} at {difficulty} level. "
             
             if context_text:
-                prompt += "Use both general subject concepts and the uploaded study materials to design the practice session.\n\n"
+                context_note = "Use both general subject concepts and the uploaded study materials to design the practice session.\n\n"
             else:
-                prompt += f"Focus on core {subject} concepts and skills.\n\n"
+                context_note = f"Focus on core {subject} concepts and skills.\n\n"
+            prompt = ADAPTIVE_PRACTICE_GENERAL_PROMPT.format(
+                subject=subject, difficulty=self.difficulty_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = "Create an adaptive practice session based entirely on the uploaded study materials and our conversation. "
-        
-        prompt += "Please:\n1. Start with easier questions to build confidence\n"
-        prompt += "2. Gradually increase difficulty based on the material\n"
-        prompt += "3. Focus on key concepts that need practice\n"
-        prompt += "4. Provide immediate feedback after each question\n"
-        prompt += "5. Create questions that build on each other\n\n"
-        prompt += "Begin with 3 warm-up questions, then progressively challenge with more complex problems."
+            
+            prompt = ADAPTIVE_PRACTICE_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def create_practice_test(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
-            difficulty = self.difficulty_var.get()
-            
-            prompt = f"Create a comprehensive practice test for {subject} at {difficulty} level"
             
             if context_text:
-                prompt += " incorporating both general subject concepts and the uploaded study materials.\n\n"
+                context_note = " incorporating both general subject concepts and the uploaded study materials.\n\n"
             else:
-                prompt += f" covering key {subject} concepts.\n\n"
+                context_note = f" covering key {subject} concepts.\n\n"
+            prompt = PRACTICE_TEST_GENERAL_PROMPT.format(
+                subject=subject, difficulty=self.difficulty_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Create a comprehensive practice test based entirely on the uploaded study materials and our conversation.\n\n"
-        
-        prompt += "Test Structure:\n1. Mix of question types (multiple choice, short answer, essay)\n"
-        prompt += "2. Cover all major topics from the material\n"
-        prompt += "3. Include easy, medium, and hard questions\n4. Provide detailed answer key\n"
-        prompt += "5. Include point values and time suggestions\n6. Add study tips for difficult concepts\n\n"
-        prompt += "Format as a real exam with clear instructions. Make it 10-15 questions covering the breadth of topics."
+            
+            prompt = PRACTICE_TEST_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def timed_assessment(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
-            difficulty = self.difficulty_var.get()
-            
-            prompt = f"Create a 20-minute timed assessment for {subject} at {difficulty} level"
             
             if context_text:
-                prompt += " incorporating both general subject concepts and the uploaded study materials.\n\n"
+                context_note = " incorporating both general subject concepts and the uploaded study materials.\n\n"
             else:
-                prompt += f" covering core {subject} concepts.\n\n"
+                context_note = f" covering core {subject} concepts.\n\n"
+            prompt = TIMED_ASSESSMENT_GENERAL_PROMPT.format(
+                subject=subject, difficulty=self.difficulty_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Create a 20-minute timed assessment based entirely on the uploaded study materials and our conversation.\n\n"
-        
-        prompt += "ASSESSMENT DESIGN:\n"
-        prompt += "1. QUESTIONS (for 20 minutes):\n"
-        prompt += "   - 60% quick recall/recognition (1-2 min each)\n"
-        prompt += "   - 30% problem-solving (3-5 min each)\n"
-        prompt += "   - 10% analysis/synthesis (5-7 min each)\n\n"
-        prompt += "2. TIME MANAGEMENT GUIDE:\n"
-        prompt += "   - Suggest time allocation per section\n"
-        prompt += "   - Include pacing strategies\n"
-        prompt += "   - Mark point values clearly\n\n"
-        prompt += "3. INSTRUCTIONS:\n"
-        prompt += "   - Clear format and expectations\n"
-        prompt += "   - Tips for managing time pressure\n"
-        prompt += "   - Scoring rubric\n\n"
-        prompt += "Base questions on the relevant topics and concepts."
+            
+            prompt = TIMED_ASSESSMENT_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def skill_assessment(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
-            grade = self.grade_var.get()
-            
-            prompt = f"Create a comprehensive skill assessment for {subject} at {grade} level"
             
             if context_text:
-                prompt += " incorporating both general subject skills and the uploaded study materials.\n\n"
+                context_note = " incorporating both general subject skills and the uploaded study materials.\n\n"
             else:
-                prompt += f" covering core {subject} skills.\n\n"
+                context_note = f" covering core {subject} skills.\n\n"
+            prompt = SKILL_ASSESSMENT_GENERAL_PROMPT.format(
+                subject=subject, grade=self.grade_var.get(), context_note=context_note)
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
-                
-            prompt = f"Create a comprehensive skill assessment based entirely on the uploaded study materials and our conversation.\n\n"
-        
-        prompt += "ASSESSMENT FRAMEWORK:\n"
-        prompt += "1. FOUNDATIONAL KNOWLEDGE (25%)\n   - Basic concepts and terminology\n   - Essential facts and principles\n\n"
-        prompt += "2. APPLICATION SKILLS (25%)\n   - Using knowledge to solve problems\n   - Applying concepts to new situations\n\n"
-        prompt += "3. ANALYTICAL THINKING (25%)\n   - Breaking down complex problems\n   - Identifying patterns and relationships\n\n"
-        prompt += "4. SYNTHESIS & EVALUATION (25%)\n   - Combining ideas creatively\n   - Making judgments and assessments\n\n"
-        prompt += "For each area, provide:\n- 2-3 diagnostic questions\n"
-        prompt += "- Performance indicators (Beginner/Intermediate/Advanced)\n"
-        prompt += "- Specific feedback based on responses\n- Targeted improvement recommendations\n"
-        prompt += "- Next steps for skill development"
+            
+            prompt = SKILL_ASSESSMENT_MATERIALS_PROMPT
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send(prompt)
     
     def improvement_suggestions(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
             
-            prompt = f"Provide personalized improvement suggestions for learning {subject}.\n\n"
+            parts = [f"Provide personalized improvement suggestions for learning {subject}.\n\n"]
             
             if context_text:
-                prompt += "Consider both general study strategies and the uploaded study materials to suggest:\n"
+                parts.append("Consider both general study strategies and the uploaded study materials to suggest:\n")
             else:
-                prompt += f"Based on effective {subject} learning strategies, suggest:\n"
+                parts.append(f"Based on effective {subject} learning strategies, suggest:\n")
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
                 
-            prompt = f"Based on the uploaded study materials and our conversation, provide personalized improvement suggestions.\n\n"
-            prompt += "Consider the study materials and our conversation to suggest:\n"
+            parts = ["Based on the uploaded study materials and our conversation, provide personalized improvement suggestions.\n\n"
+                     "Consider the study materials and our conversation to suggest:\n"]
         
-        prompt += "1. Areas that might need more focus\n2. Study techniques that could help\n"
-        prompt += "3. Ways to deepen understanding\n4. Next topics to explore\n"
-        prompt += "5. Methods to retain information better\n6. Specific practice exercises\n"
-        prompt += "7. Resources for further learning"
+        parts.append(IMPROVEMENT_SUGGESTIONS_STEPS)
         
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+        self.set_input_and_send("".join(parts))
     
     def identify_strengths(self):
-        context_text = self.context_display.get("1.0", tk.END).strip()
+        context_text = self.get_context_text()
         
         if self.use_general_mode.get():
             subject = self.subject_var.get()
             
-            prompt = f"Help me identify my learning strengths in {subject} based on our conversation"
-            
-            if context_text:
-                prompt += " and the uploaded study materials.\n\n"
-            else:
-                prompt += ".\n\n"
+            parts = [f"Help me identify my learning strengths in {subject} based on our conversation",
+                     " and the uploaded study materials.\n\n" if context_text else ".\n\n"]
         else:
-            if not context_text:
-                messagebox.showwarning("No Study Materials", "Please upload study materials or enable general subject settings.")
+            if self.study_materials_missing(context_text):
                 return
                 
-            prompt = f"Based on the uploaded study materials and our conversation, help me identify my learning strengths.\n\n"
+            parts = ["Based on the uploaded study materials and our conversation, help me identify my learning strengths.\n\n"]
         
         chat_count = len(self.chat_history)
         if chat_count > 0:
-            user_messages = sum(1 for msg in self.chat_history if msg.get('role') == 'user')
-            prompt += f"Conversation Analysis:\n- Total messages exchanged: {chat_count}\n"
-            prompt += f"- Questions asked: {user_messages}\n\n"
+            user_messages = self.get_role_counts().get('user', 0)
+            parts.append(f"Conversation Analysis:\n- Total messages exchanged: {chat_count}\n"
+                         f"- Questions asked: {user_messages}\n\n")
         
-        prompt += "Based on our conversation"
+        parts.append("Based on our conversation")
         if context_text:
-            prompt += ", the uploaded study materials,"
-        prompt += " and any patterns you can observe, please analyze:\n"
-        
-        prompt += "1. Learning style preferences I'm showing\n2. Areas where I seem most engaged\n"
-        prompt += "3. Types of questions I ask most\n4. Problem-solving approaches I prefer\n"
-        prompt += "5. Consistent patterns in my learning\n6. Strengths to build upon\n"
-        prompt += "7. Natural talents or inclinations you've noticed"
-        
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", prompt)
-        self.send_message()
+            parts.append(", the uploaded study materials,")
+        parts.append(STRENGTHS_ANALYSIS_STEPS)
+        
+        self.set_input_and_send("".join(parts))
+
+
+BANNER = "\n".join([
+    "Educational AI Tutor - Multimodal Learning Assistant (Offline Ready)",
+    "===================================================================",
+    "🌐 OFFLINE FEATURES: Complete privacy • No internet required after download • Local AI processing",
+    "🎓 MULTIMODAL: Text, Image, Audio (Record + Import), Screen Capture, Smart Clipboard, Documents",
+    "🤖 AI MODELS: Gemma 3n (2B/4B/5B/8B) - Download once, use forever offline",
+    "📊 MANAGEMENT: 32K context limit, real-time tracking, history management, model management",
+    "📄 FORMATS: PDF, DOCX, TXT, MD, RTF, HTML, CSS, JS, PY, XML, JSON",
+    "🎵 AUDIO: MP3, WAV, M4A, AAC, OGG, FLAC, WMA",
+    "📖 Press F1 or click 'Help & Info' for comprehensive usage guide",
+    "🤖 Click 'Model Manager' to download AI models for offline use",
+    "",
+]) + "\n"
 
 def main():
     root = tk.Tk()
     
-    root.resizable(True, True)
-    root.wm_resizable(True, True)
-    
-    try:
-        root.wm_attributes('-type', 'normal')
-    except:
-        pass
-    
     app = ChatbotApp(root)
     
-    root.resizable(True, True)
-    root.wm_resizable(True, True)
-    
     print("Main window should now be resizable")
     print("Try dragging the window edges/corners")
     
-    try:
-        root.iconbitmap(default='icon.ico')
-    except:
-        pass
+    if os.path.exists('icon.ico'):
+        try:
+            root.iconbitmap(default='icon.ico')
+        except:
+            pass
     
     root.mainloop()
 
 if __name__ == "__main__":
-    print("Educational AI Tutor - Multimodal Learning Assistant (Offline Ready)")
-    print("===================================================================")
-    print("🌐 OFFLINE FEATURES: Complete privacy • No internet required after download • Local AI processing")
-    print("🎓 MULTIMODAL: Text, Image, Audio (Record + Import), Screen Capture, Smart Clipboard, Documents")
-    print("🤖 AI MODELS: Gemma 3n (2B/4B/5B/8B) - Download once, use forever offline")
-    print("📊 MANAGEMENT: 32K context limit, real-time tracking, history management, model management")
-    print("📄 FORMATS: PDF, DOCX, TXT, MD, RTF, HTML, CSS, JS, PY, XML, JSON")
-    print("🎵 AUDIO: MP3, WAV, M4A, AAC, OGG, FLAC, WMA")
-    print("📖 Press F1 or click 'Help & Info' for comprehensive usage guide")
-    print("🤖 Click 'Model Manager' to download AI models for offline use")
-    print("")
+    sys.stdout.write(BANNER)
     main()